@@ -4,3 +4,4 @@ pip install -r requirements.txt
 pip install psycopg2-binary
 python manage.py collectstatic --no-input
 python manage.py migrate
+python manage.py createcachetable
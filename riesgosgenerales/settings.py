@@ -96,6 +96,20 @@ DATABASES = {
     )
 }
 
+# Cache (compartida entre workers; crear con `manage.py createcachetable`)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "rrgg_cache",
+    }
+}
+
+# Listados: por encima de este número de filas se usan conteos estimados
+
+RRGG_EXACT_COUNT_THRESHOLD = 10000
+RRGG_COUNT_CACHE_TIMEOUT = 300
+
 # Logging
 
 if not DEBUG:
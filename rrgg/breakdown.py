@@ -0,0 +1,225 @@
+"""Desglose de primas por lotes.
+
+Calcula a la vez el derecho de emisión, la prima comercial, el IGV, la
+prima total, las cuotas y las comisiones de muchas primas. Los montos se
+llevan a céntimos y los porcentajes a diezmilésimos enteros, así que el
+cálculo es aritmética de enteros con las mismas reglas que las propiedades
+de ``QuotationInsuranceVehiclePremium`` y ``Endorsement``: ``to_decimal``
+redondea la mitad hacia arriba y ``round`` de las cuotas redondea la mitad
+al par.
+"""
+
+from decimal import Decimal
+from typing import Dict, List, Sequence, Union
+
+from django.db.models import F
+
+from .totals import money_expression
+
+Number = Union[Decimal, int, str]
+
+# DecimalField(decimal_places=2) y DecimalField(decimal_places=4)
+AMOUNT_PLACES = 2
+PERCENTAGE_PLACES = 4
+
+PREMIUM_FIELDS = (
+    "emission_right",
+    "commercial_premium",
+    "tax",
+    "total",
+    "fee",
+    "direct_debit",
+)
+
+COMMISSION_FIELDS = (
+    "net_commission",
+    "seller_commission",
+    "kcs_commission",
+)
+
+# cuotas del reporte de cotización
+FEES = 4
+DIRECT_DEBITS = 12
+
+_SCALE = 10**PERCENTAGE_PLACES
+
+
+def _to_int(value: Number, places: int) -> int:
+    value = Decimal(value).scaleb(places)
+    integral = int(value)
+    if integral != value:
+        raise ValueError(
+            f"{value.scaleb(-places)} tiene más de {places} decimales"
+        )
+    return integral
+
+
+def _half_up(numerator: int, denominator: int) -> int:
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if 2 * remainder >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def _half_even(numerator: int, denominator: int) -> int:
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if 2 * remainder > denominator or (
+        2 * remainder == denominator and quotient % 2
+    ):
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def _column(values, places: int, size: int) -> List[int]:
+    if isinstance(values, (Decimal, int, str)):
+        return [_to_int(values, places)] * size
+    column = [_to_int(value, places) for value in values]
+    if len(column) != size:
+        raise ValueError("Las columnas deben tener el mismo tamaño")
+    return column
+
+
+def _money(cents: List[int]) -> List[Decimal]:
+    return [Decimal(value).scaleb(-AMOUNT_PLACES) for value in cents]
+
+
+def breakdown(
+    net_premiums: Sequence[Number],
+    emission_right_percentages,
+    tax_percentages,
+    plan_commission_percentages=None,
+    seller_commission_percentages=None,
+) -> Dict[str, List[Decimal]]:
+    """Devuelve una lista por cada monto derivado de ``net_premiums``.
+
+    Los porcentajes pueden ser una secuencia del mismo tamaño o un único
+    valor para todas las primas. Las comisiones solo se calculan si se
+    indican los dos porcentajes de comisión.
+    """
+    size = len(net_premiums)
+    amounts = [_to_int(amount, AMOUNT_PLACES) for amount in net_premiums]
+    emission_rights = [
+        _half_up(amount * percentage, _SCALE)
+        for amount, percentage in zip(
+            amounts,
+            _column(emission_right_percentages, PERCENTAGE_PLACES, size),
+        )
+    ]
+    commercial_premiums = [
+        amount + emission_right
+        for amount, emission_right in zip(amounts, emission_rights)
+    ]
+    taxes = [
+        _half_up(commercial_premium * percentage, _SCALE)
+        for commercial_premium, percentage in zip(
+            commercial_premiums,
+            _column(tax_percentages, PERCENTAGE_PLACES, size),
+        )
+    ]
+    totals = [
+        commercial_premium + tax
+        for commercial_premium, tax in zip(commercial_premiums, taxes)
+    ]
+    result = {
+        "emission_right": _money(emission_rights),
+        "commercial_premium": _money(commercial_premiums),
+        "tax": _money(taxes),
+        "total": _money(totals),
+        "fee": _money([_half_even(total, FEES) for total in totals]),
+        "direct_debit": _money(
+            [_half_even(total, DIRECT_DEBITS) for total in totals]
+        ),
+    }
+    if (
+        plan_commission_percentages is None
+        or seller_commission_percentages is None
+    ):
+        return result
+    net_commissions = [
+        _half_up(amount * percentage, _SCALE)
+        for amount, percentage in zip(
+            amounts,
+            _column(plan_commission_percentages, PERCENTAGE_PLACES, size),
+        )
+    ]
+    seller_commissions = [
+        _half_up(net_commission * percentage, _SCALE)
+        for net_commission, percentage in zip(
+            net_commissions,
+            _column(seller_commission_percentages, PERCENTAGE_PLACES, size),
+        )
+    ]
+    result["net_commission"] = _money(net_commissions)
+    result["seller_commission"] = _money(seller_commissions)
+    result["kcs_commission"] = _money(
+        [
+            net_commission - seller_commission
+            for net_commission, seller_commission in zip(
+                net_commissions, seller_commissions
+            )
+        ]
+    )
+    return result
+
+
+def breakdown_expressions(
+    amount="amount",
+    emission_right_percentage="emission_right_percentage",
+    tax_percentage="tax_percentage",
+):
+    """Expresiones del desglose para anotar primas en SQL.
+
+    Se anotan como ``computed_<campo>`` porque el nombre ya lo usan las
+    propiedades del modelo. Las cuotas no se incluyen: ``round`` redondea
+    la mitad al par y ``ROUND`` de PostgreSQL no.
+    """
+    emission_right = money_expression(F(amount) * F(emission_right_percentage))
+    commercial_premium = money_expression(F(amount) + emission_right)
+    tax = money_expression(commercial_premium * F(tax_percentage))
+    return {
+        "computed_emission_right": emission_right,
+        "computed_commercial_premium": commercial_premium,
+        "computed_tax": tax,
+        "computed_total": money_expression(commercial_premium + tax),
+    }
+
+
+def rows(columns: Dict[str, List[Decimal]]) -> List[Dict[str, Decimal]]:
+    """Pasa el resultado de ``breakdown`` a un diccionario por prima."""
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def premium_breakdown(premiums) -> List[Dict[str, Decimal]]:
+    """Desglose de instancias de ``QuotationInsuranceVehiclePremium``."""
+    premiums = list(premiums)
+    return rows(
+        breakdown(
+            [premium.amount for premium in premiums],
+            [premium.emission_right_percentage for premium in premiums],
+            [premium.tax_percentage for premium in premiums],
+        )
+    )
+
+
+def endorsement_breakdown(endorsements) -> List[Dict[str, Decimal]]:
+    """Desglose de instancias de ``Endorsement`` con sus comisiones."""
+    endorsements = list(endorsements)
+    return rows(
+        breakdown(
+            [endorsement.net_premium for endorsement in endorsements],
+            [
+                endorsement.emission_right_percentage
+                for endorsement in endorsements
+            ],
+            [endorsement.tax_percentage for endorsement in endorsements],
+            [
+                endorsement.plan_commission_percentage
+                for endorsement in endorsements
+            ],
+            [
+                endorsement.seller_commission_percentage
+                for endorsement in endorsements
+            ],
+        )
+    )
@@ -0,0 +1,98 @@
+"""Caché de resultados versionada por generación de datos.
+
+Cada conjunto de datos tiene un contador de generación en la caché. Los
+resultados se guardan junto con la generación con la que se calcularon; al
+incrementarse el contador dejan de ser válidos. Mientras un proceso
+recalcula una entrada vencida, los demás siguen sirviendo el valor anterior.
+"""
+
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+
+
+def _generation_key(name):
+    return f"rrgg:generation:{name}"
+
+
+def get_generation(name):
+    key = _generation_key(name)
+    generation = cache.get(key)
+    if generation is None:
+        # se parte de la hora actual para no repetir una generación anterior
+        # si el contador fue desalojado de la caché
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+# segundos entre lecturas mientras se espera un candado o un resultado
+POLL_INTERVAL = 0.05
+
+
+def _acquire(lock_key, timeout, wait):
+    deadline = time.monotonic() + wait
+    while not cache.add(lock_key, 1, timeout=timeout):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(POLL_INTERVAL)
+    return True
+
+
+def bump_generation(name, lock_timeout=10):
+    # incr no es atómico en DatabaseCache (lee y vuelve a escribir), así que
+    # dos incrementos simultáneos podrían dejar el mismo valor
+    key = _generation_key(name)
+    lock_key = f"{key}:lock"
+    locked = _acquire(lock_key, lock_timeout, wait=lock_timeout)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+def _wait_for_result(key, wait):
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cached_result(
+    name, params, compute, generation, timeout=900, lock_timeout=60, wait=5
+):
+    """Devuelve ``compute()`` cacheado por ``params`` y la generación.
+
+    Solo el proceso que obtiene el candado recalcula una entrada vencida;
+    el resto devuelve el valor anterior si existe. Si no hay ninguno, esperan
+    hasta ``wait`` segundos a que el proceso con el candado lo guarde; pasado
+    ese tiempo calculan el resultado sin guardarlo.
+    """
+    key = f"rrgg:result:{name}:{urlencode(sorted(params.items()))}"
+    current = get_generation(generation)
+    entry = cache.get(key)
+    now = time.time()
+    if entry is not None:
+        entry_generation, expires, value = entry
+        if entry_generation == current and expires > now:
+            return value
+
+    lock_key = f"{key}:lock"
+    if not cache.add(lock_key, 1, timeout=lock_timeout):
+        if entry is None:
+            entry = _wait_for_result(key, wait)
+        return entry[2] if entry is not None else compute()
+
+    try:
+        value = compute()
+        cache.set(key, (current, now + timeout, value), timeout=None)
+    finally:
+        cache.delete(lock_key)
+    return value
@@ -0,0 +1,208 @@
+"""Liquidación de comisiones por asesor y periodo.
+
+Las emisiones guardan el porcentaje de comisión del asesor vigente al
+emitirlas (``ConsultantRate.new_sale`` o ``renewal``) y sus montos, así que
+la liquidación solo suma columnas. Emisiones y endosos se agrupan por
+asesor, tipo y moneda en una sola consulta (``UNION ALL``).
+
+Los endosos sin emisión asociada no tienen asesor, así que no entran en la
+liquidación; ``unassigned_endorsements`` los cuenta para avisarlo.
+
+Las liquidaciones de meses cerrados se cachean con la generación
+``commissions``, que se incrementa al modificar emisiones o endosos.
+"""
+
+from datetime import date
+from decimal import Decimal
+from typing import List, NamedTuple, Optional
+
+from django.apps import apps as global_apps
+from django.db.models import (
+    CharField,
+    Count,
+    DecimalField,
+    F,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import bump_generation, cached_result
+from .totals import money_expression
+
+GENERATION = "commissions"
+
+# tipo que se muestra para los endosos junto a los tipos de emisión
+ENDORSEMENT = "Endoso"
+
+# un mes cerrado solo cambia si se corrige una emisión o endoso antiguo
+CLOSED_TIMEOUT = 60 * 60 * 24 * 30
+
+FIELDS = (
+    "net_premium",
+    "net_commission",
+    "seller_commission",
+    "kcs_commission",
+)
+
+
+class StatementRow(NamedTuple):
+    consultant_id: int
+    consultant: str
+    kind: str
+    currency: str
+    count: int
+    net_premium: Decimal
+    net_commission: Decimal
+    seller_commission: Decimal
+    kcs_commission: Decimal
+
+
+def _sum(expression):
+    return Coalesce(
+        Sum(expression),
+        Value(Decimal(0)),
+        output_field=DecimalField(max_digits=16, decimal_places=2),
+    )
+
+
+def _issuances(year, month, consultant_id):
+    issuance_model = global_apps.get_model("rrgg", "IssuanceInsuranceVehicle")
+    premium_model = global_apps.get_model(
+        "rrgg", "QuotationInsuranceVehiclePremium"
+    )
+    currency = premium_model.objects.filter(issuances=OuterRef("pk")).order_by(
+        "id"
+    )
+    queryset = issuance_model.objects.filter(
+        issuance_date__year=year, issuance_date__month=month
+    )
+    if consultant_id is not None:
+        queryset = queryset.filter(consultant_seller_id=consultant_id)
+    return (
+        queryset.annotate(
+            statement_consultant=F("consultant_seller_id"),
+            statement_kind=F("issuance_type__name"),
+            statement_currency=Subquery(
+                currency.values("quotation_insurance_vehicle__currency__name")[
+                    :1
+                ]
+            ),
+        )
+        .values("statement_consultant", "statement_kind", "statement_currency")
+        .annotate(
+            statement_count=Count("id"),
+            **{f"statement_{field}": _sum(field) for field in FIELDS},
+        )
+        .order_by()
+    )
+
+
+def _period_endorsements(year, month):
+    endorsement_model = global_apps.get_model("rrgg", "EndorsementVehicle")
+    return endorsement_model.objects.filter(
+        issuance_date__year=year, issuance_date__month=month
+    )
+
+
+def _endorsements(year, month, consultant_id):
+    queryset = _period_endorsements(year, month).filter(issuance__isnull=False)
+    if consultant_id is not None:
+        queryset = queryset.filter(
+            issuance__consultant_seller_id=consultant_id
+        )
+    # mismas fórmulas que las propiedades de Endorsement
+    net_commission = money_expression(
+        F("net_premium") * F("plan_commission_percentage")
+    )
+    seller_commission = money_expression(
+        F("seller_commission_percentage") * net_commission
+    )
+    return (
+        queryset.annotate(
+            statement_consultant=F("issuance__consultant_seller_id"),
+            statement_kind=Value(ENDORSEMENT, output_field=CharField()),
+            statement_currency=F("currency__name"),
+        )
+        .values("statement_consultant", "statement_kind", "statement_currency")
+        .annotate(
+            statement_count=Count("id"),
+            statement_net_premium=_sum("net_premium"),
+            statement_net_commission=_sum(net_commission),
+            statement_seller_commission=_sum(seller_commission),
+            statement_kcs_commission=_sum(net_commission - seller_commission),
+        )
+        .order_by()
+    )
+
+
+def compute_statement(
+    year: int, month: int, consultant_id: Optional[int] = None
+) -> List[StatementRow]:
+    consultant_model = global_apps.get_model("rrgg", "Consultant")
+    rows = _issuances(year, month, consultant_id).union(
+        _endorsements(year, month, consultant_id), all=True
+    )
+    rows = list(rows)
+    consultants = {
+        consultant.id: f"{consultant.given_name} {consultant.first_surname}"
+        for consultant in consultant_model.objects.filter(
+            id__in={row["statement_consultant"] for row in rows}
+        )
+    }
+    statement = [
+        StatementRow(
+            consultant_id=row["statement_consultant"],
+            consultant=consultants[row["statement_consultant"]],
+            kind=row["statement_kind"],
+            currency=row["statement_currency"] or "",
+            count=row["statement_count"],
+            **{field: row[f"statement_{field}"] for field in FIELDS},
+        )
+        for row in rows
+    ]
+    statement.sort(
+        key=lambda row: (
+            row.consultant,
+            row.consultant_id,
+            row.kind == ENDORSEMENT,
+            row.kind,
+            row.currency,
+        )
+    )
+    return statement
+
+
+def unassigned_endorsements(year: int, month: int) -> int:
+    """Endosos del periodo sin emisión, que no entran en la liquidación."""
+    return _period_endorsements(year, month).filter(issuance=None).count()
+
+
+def is_closed(year: int, month: int, today: Optional[date] = None) -> bool:
+    today = today or timezone.localdate()
+    return (year, month) < (today.year, today.month)
+
+
+def statement(
+    year: int, month: int, consultant_id: Optional[int] = None
+) -> List[StatementRow]:
+    """Liquidación del periodo; cacheada si el mes ya cerró."""
+    if not is_closed(year, month):
+        return compute_statement(year, month, consultant_id)
+    params = {"year": year, "month": month}
+    if consultant_id is not None:
+        params["consultant"] = consultant_id
+    return cached_result(
+        "commission_statement",
+        params,
+        lambda: compute_statement(year, month, consultant_id),
+        generation=GENERATION,
+        timeout=CLOSED_TIMEOUT,
+    )
+
+
+def invalidate():
+    bump_generation(GENERATION)
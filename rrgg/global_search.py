@@ -0,0 +1,225 @@
+"""Índice de la búsqueda global.
+
+``SearchEntry`` guarda una fila por persona, vehículo, cotización y emisión
+con el texto en que se busca en mayúsculas. La columna tiene un índice
+trigram, así que el typeahead consulta una sola tabla en lugar de cinco.
+"""
+
+from django.apps import apps as global_apps
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .search import join_words, person_terms
+
+
+def _full_name(person):
+    return " ".join(
+        filter(
+            None,
+            [person.given_name, person.first_surname, person.second_surname],
+        )
+    )
+
+
+def _customer_name(customer):
+    if customer.natural_person:
+        return _full_name(customer.natural_person)
+    if customer.legal_person:
+        return customer.legal_person.registered_name
+    return ""
+
+
+def _membership_id(person):
+    # la relación inversa no existe para propietarios que no son clientes
+    membership = getattr(person, "membership", None)
+    return membership.id if membership else None
+
+
+def _natural_person(person):
+    name = _full_name(person)
+    return {
+        "title": name,
+        "subtitle": person.document_number,
+        "link_id": _membership_id(person),
+        "document": join_words(
+            [
+                name,
+                person.document_number,
+                person.email,
+                person.phone_number,
+            ]
+        ),
+    }
+
+
+def _legal_person(person):
+    return {
+        "title": person.registered_name,
+        "subtitle": person.document_number,
+        "link_id": _membership_id(person),
+        "document": join_words(
+            [
+                person.registered_name,
+                person.general_manager,
+                person.document_number,
+                person.email,
+                person.phone_number,
+            ]
+        ),
+    }
+
+
+def _vehicle(vehicle):
+    return {
+        "title": vehicle.plate or "",
+        "subtitle": (
+            f"{vehicle.brand} {vehicle.vehicle_model}"
+            f" {vehicle.fabrication_year}"
+        ),
+        "document": join_words(
+            [
+                vehicle.plate,
+                vehicle.brand,
+                vehicle.vehicle_model,
+                vehicle.engine,
+                vehicle.chassis,
+            ]
+        ),
+    }
+
+
+def _quotation(quotation):
+    seller = quotation.consultant_seller
+    return {
+        "title": f"Cotización {quotation.id}",
+        "subtitle": (
+            f"{_customer_name(quotation.customer)} -"
+            f" {quotation.vehicle.plate or ''}"
+        ),
+        "document": join_words(
+            [
+                quotation.id,
+                *person_terms(quotation.customer),
+                quotation.vehicle.plate,
+                seller.given_name if seller else None,
+                seller.first_surname if seller else None,
+            ]
+        ),
+    }
+
+
+def _issuance(issuance):
+    return {
+        "title": f"Póliza {issuance.policy}",
+        "subtitle": f"{issuance.issuance_date} - {issuance.status.name}",
+        # el documento ya lo arma rrgg.search al guardar la emisión
+        "document": join_words([issuance.id, issuance.search_document]),
+    }
+
+
+# tipo -> (modelo, relaciones a cargar, constructor de la entrada)
+KINDS = {
+    "natural_person": ("NaturalPerson", ("membership",), _natural_person),
+    "legal_person": ("LegalPerson", ("membership",), _legal_person),
+    "vehicle": ("Vehicle", (), _vehicle),
+    "quotation": (
+        "QuotationInsuranceVehicle",
+        (
+            "customer__natural_person",
+            "customer__legal_person",
+            "vehicle",
+            "consultant_seller",
+        ),
+        _quotation,
+    ),
+    "issuance": ("IssuanceInsuranceVehicle", ("status",), _issuance),
+}
+
+
+def _entries(entry_model, kind, objects):
+    build = KINDS[kind][2]
+    for obj in objects:
+        yield entry_model(kind=kind, object_id=obj.id, **build(obj))
+
+
+def refresh(kind, ids):
+    """Reconstruye las entradas ``kind`` de los objetos ``ids``.
+
+    Las entradas de objetos que ya no existen simplemente se borran.
+    """
+    model_name, related, _build = KINDS[kind]
+    model = global_apps.get_model("rrgg", model_name)
+    entry_model = global_apps.get_model("rrgg", "SearchEntry")
+    ids = list(ids)
+    if not ids:
+        return
+    with transaction.atomic():
+        entry_model.objects.filter(kind=kind, object_id__in=ids).delete()
+        entry_model.objects.bulk_create(
+            _entries(
+                entry_model,
+                kind,
+                model.objects.filter(id__in=ids).select_related(*related),
+            )
+        )
+
+
+def rebuild(batch_size=500):
+    """Reconstruye todo el índice."""
+    entry_model = global_apps.get_model("rrgg", "SearchEntry")
+    created = 0
+    with transaction.atomic():
+        entry_model.objects.all().delete()
+        for kind, (model_name, related, _build) in KINDS.items():
+            model = global_apps.get_model("rrgg", model_name)
+            objects = (
+                model.objects.select_related(*related)
+                .order_by("id")
+                .iterator(chunk_size=batch_size)
+            )
+            batch = []
+            for entry in _entries(entry_model, kind, objects):
+                batch.append(entry)
+                if len(batch) >= batch_size:
+                    entry_model.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            entry_model.objects.bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+def search(query, per_kind=5):
+    """Busca ``query`` y devuelve pares ``(tipo, entradas)``.
+
+    Cada palabra debe aparecer en el documento; dentro de cada tipo se
+    ordena por similitud y se devuelven a lo sumo ``per_kind`` resultados,
+    todo en una sola consulta.
+    """
+    entry_model = global_apps.get_model("rrgg", "SearchEntry")
+    words = query.upper().split()
+    if not words:
+        return []
+    queryset = entry_model.objects.all()
+    for word in words:
+        queryset = queryset.filter(document__icontains=word)
+    queryset = (
+        queryset.annotate(
+            rank=TrigramWordSimilarity(" ".join(words), "document")
+        )
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F("kind"),
+                order_by=[F("rank").desc(), F("id").desc()],
+            )
+        )
+        .filter(position__lte=per_kind)
+        .order_by("kind", "position")
+    )
+    groups = {kind: [] for kind in KINDS}
+    for entry in queryset:
+        groups[entry.kind].append(entry)
+    return [(kind, entries) for kind, entries in groups.items() if entries]
@@ -0,0 +1,262 @@
+"""Conversión de la data histórica en texto a registros tipados."""
+
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from django.apps import apps as global_apps
+
+MONTHS = (
+    "ENERO",
+    "FEBRERO",
+    "MARZO",
+    "ABRIL",
+    "MAYO",
+    "JUNIO",
+    "JULIO",
+    "AGOSTO",
+    "SEPTIEMBRE",
+    "OCTUBRE",
+    "NOVIEMBRE",
+    "DICIEMBRE",
+)
+
+MONTH_NUMBERS = {name: number for number, name in enumerate(MONTHS, 1)}
+
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d/%m/%y", "%d-%m-%Y")
+
+# campo del registro tipado -> campo de HistoricalData
+DATE_FIELDS = {
+    "register_date": "register_date",
+    "issuance_date": "issuance_date",
+    "initial_validity": "initial_validity",
+    "final_validity": "final_validity",
+    "payment_date": "payment_date",
+}
+
+AMOUNT_FIELDS = {
+    "insured_amount": "insured_amount",
+    "net_premium": "net_premium",
+    "commercial_premium": "commercial_premium",
+    "total_premium": "total_premium",
+    "net_commission": "net_commission_amount",
+}
+
+# campo del registro tipado -> (campo de HistoricalData, modelo de búsqueda)
+LOOKUP_FIELDS = {
+    "consultant": ("consultant", "HistoricalConsultant"),
+    "insurer": ("insurance_vehicle", "HistoricalInsurer"),
+    "currency": ("currency", "HistoricalCurrency"),
+    "risk": ("risk", "HistoricalRisk"),
+    "status": ("status", "HistoricalStatus"),
+}
+
+# sin estos campos el registro no puede ubicarse en el dashboard
+REQUIRED_FIELDS = ("year", "month", "currency")
+
+TWO_PLACES = Decimal("0.01")
+FOUR_PLACES = Decimal("0.0001")
+
+
+class ParsedRow(NamedTuple):
+    values: Dict[str, object]
+    labels: Dict[str, Optional[str]]
+    errors: Dict[str, str]
+
+    @property
+    def rejected(self):
+        return any(field in self.errors for field in REQUIRED_FIELDS)
+
+
+def _clean(value) -> str:
+    return " ".join(str(value or "").split())
+
+
+def parse_label(value) -> Optional[str]:
+    return _clean(value).upper() or None
+
+
+def parse_year(value) -> Optional[int]:
+    value = _clean(value)
+    if not value:
+        return None
+    if not value.isdigit():
+        raise ValueError(f"Año inválido: {value}")
+    year = int(value)
+    if not 1900 <= year <= 2100:
+        raise ValueError(f"Año fuera de rango: {value}")
+    return year
+
+
+def parse_month(value) -> Optional[int]:
+    value = _clean(value).upper()
+    if not value:
+        return None
+    if value.isdigit() and 1 <= int(value) <= 12:
+        return int(value)
+    try:
+        return MONTH_NUMBERS[value]
+    except KeyError:
+        raise ValueError(f"Mes desconocido: {value}") from None
+
+
+def parse_date(value) -> Optional[date]:
+    if isinstance(value, date):
+        return value
+    value = _clean(value)
+    if not value:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha inválida: {value}")
+
+
+def parse_amount(value) -> Optional[Decimal]:
+    value = _clean(value).replace(",", "").replace(" ", "")
+    if not value:
+        return None
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"Monto inválido: {value}") from None
+    if not amount.is_finite():
+        raise ValueError(f"Monto inválido: {value}")
+    return amount.quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def parse_percentage(value) -> Optional[Decimal]:
+    value = _clean(value).replace(" ", "")
+    if not value:
+        return None
+    is_percent = value.endswith("%")
+    try:
+        percentage = Decimal(value.rstrip("%"))
+    except InvalidOperation:
+        raise ValueError(f"Porcentaje inválido: {value}") from None
+    if is_percent or percentage > 1:
+        percentage /= 100
+    return percentage.quantize(FOUR_PLACES, rounding=ROUND_HALF_UP)
+
+
+def parse_row(data) -> ParsedRow:
+    """Convierte una fila de ``HistoricalData`` en valores tipados.
+
+    Los errores se devuelven por campo; un campo inválido queda en ``None``.
+    La fila se considera rechazada si falla algún campo de
+    ``REQUIRED_FIELDS``.
+    """
+    values: Dict[str, object] = {}
+    labels: Dict[str, Optional[str]] = {}
+    errors: Dict[str, str] = {}
+
+    parsers = [
+        ("year", parse_year, data.year),
+        ("month", parse_month, data.months),
+        (
+            "kcs_commission_percentage",
+            parse_percentage,
+            data.kcs_commission_percentage,
+        ),
+    ]
+    parsers += [
+        (field, parse_date, getattr(data, source))
+        for field, source in DATE_FIELDS.items()
+    ]
+    parsers += [
+        (field, parse_amount, getattr(data, source))
+        for field, source in AMOUNT_FIELDS.items()
+    ]
+    for field, parser, raw in parsers:
+        try:
+            values[field] = parser(raw)
+        except ValueError as error:
+            values[field] = None
+            errors[field] = str(error)
+
+    for field, (source, _model_name) in LOOKUP_FIELDS.items():
+        labels[field] = parse_label(getattr(data, source))
+
+    parsed = {**values, **labels}
+    for field in REQUIRED_FIELDS:
+        if parsed[field] is None:
+            errors.setdefault(field, "Campo requerido")
+
+    return ParsedRow(values, labels, errors)
+
+
+class HistoricalLoader:
+    """Carga registros tipados a partir de ``HistoricalData``.
+
+    Los rechazos y advertencias quedan en ``rejects`` y ``warnings`` como
+    pares ``(id de HistoricalData, errores)``.
+    """
+
+    def __init__(self, apps=global_apps):
+        self.record_model = apps.get_model("rrgg", "HistoricalRecord")
+        self.lookup_models = {
+            field: apps.get_model("rrgg", model_name)
+            for field, (_source, model_name) in LOOKUP_FIELDS.items()
+        }
+        self._lookup_ids: Dict[str, Dict[str, int]] = {
+            field: {} for field in LOOKUP_FIELDS
+        }
+        self.rejects: List[Tuple[int, Dict[str, str]]] = []
+        self.warnings: List[Tuple[int, Dict[str, str]]] = []
+
+    def lookup_id(self, field, name) -> Optional[int]:
+        if name is None:
+            return None
+        cache = self._lookup_ids[field]
+        if name not in cache:
+            instance, _ = self.lookup_models[field].objects.get_or_create(
+                name=name
+            )
+            cache[name] = instance.id
+        return cache[name]
+
+    def build(self, data):
+        """Registro tipado sin guardar, o ``None`` si la fila se rechaza."""
+        row = parse_row(data)
+        if row.rejected:
+            self.rejects.append((data.id, row.errors))
+            return None
+        if row.errors:
+            self.warnings.append((data.id, row.errors))
+        fields = dict(row.values)
+        for field, name in row.labels.items():
+            fields[f"{field}_id"] = self.lookup_id(field, name)
+        return self.record_model(source_id=data.id, **fields)
+
+    def load(self, data):
+        """Sincroniza el registro tipado de una sola fila."""
+        record = self.build(data)
+        if record is None:
+            self.record_model.objects.filter(source_id=data.id).delete()
+            return None
+        record.id = (
+            self.record_model.objects.filter(source_id=data.id)
+            .values_list("id", flat=True)
+            .first()
+        )
+        record.save()
+        return record
+
+    def load_all(self, queryset, batch_size=1000):
+        """Reconstruye todos los registros tipados de ``queryset``."""
+        self.record_model.objects.filter(source__in=queryset).delete()
+        batch = []
+        loaded = 0
+        for data in queryset.order_by("id").iterator(chunk_size=batch_size):
+            record = self.build(data)
+            if record is None:
+                continue
+            batch.append(record)
+            if len(batch) >= batch_size:
+                self.record_model.objects.bulk_create(batch)
+                loaded += len(batch)
+                batch = []
+        self.record_model.objects.bulk_create(batch)
+        return loaded + len(batch)
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rrgg import rollup
+from rrgg.historical import HistoricalLoader
+from rrgg.models import HistoricalData
+
+
+class Command(BaseCommand):
+    help = "Reconstruye la data histórica tipada."  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--year",
+            help="Solo procesa las filas de este año (texto original).",
+        )
+        parser.add_argument(
+            "--warnings",
+            action="store_true",
+            help="Muestra también los campos opcionales que no se leyeron.",
+        )
+
+    def handle(self, *args, **options):
+        queryset = HistoricalData.objects.all()
+        if options["year"]:
+            queryset = queryset.filter(year=options["year"])
+
+        loader = HistoricalLoader()
+        with transaction.atomic(), rollup.paused():
+            loaded = loader.load_all(queryset)
+            rollup.rebuild()
+
+        for data_id, errors in loader.rejects:
+            self.stderr.write(f"Rechazado {data_id}: {self._format(errors)}")
+        if options["warnings"]:
+            for data_id, errors in loader.warnings:
+                self.stdout.write(
+                    f"Advertencia {data_id}: {self._format(errors)}"
+                )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{loaded} registros cargados, {len(loader.rejects)}"
+                f" rechazados, {len(loader.warnings)} con advertencias."
+            )
+        )
+
+    @staticmethod
+    def _format(errors):
+        return "; ".join(
+            f"{field}: {error}" for field, error in errors.items()
+        )
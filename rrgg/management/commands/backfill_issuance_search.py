@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rrgg import search
+
+
+class Command(BaseCommand):
+    help = (  # noqa: A003
+        "Reconstruye el documento de búsqueda de las emisiones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = search.backfill(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"{updated} emisiones actualizadas.")
+        )
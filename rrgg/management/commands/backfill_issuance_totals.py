@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rrgg import totals
+from rrgg.models import IssuanceInsuranceVehicle
+
+
+class Command(BaseCommand):
+    help = "Recalcula los montos guardados de las emisiones."  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help=(
+                "Solo compara los montos guardados con los calculados en la"
+                " base de datos."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            self.check_totals()
+            return
+        with transaction.atomic():
+            updated = totals.backfill(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"{updated} emisiones actualizadas.")
+        )
+
+    def check_totals(self):
+        differences = 0
+        issuances = IssuanceInsuranceVehicle.objects.with_totals().order_by(
+            "id"
+        )
+        for issuance in issuances.iterator(chunk_size=500):
+            for field in totals.TOTAL_FIELDS:
+                stored = getattr(issuance, field)
+                computed = getattr(issuance, f"computed_{field}")
+                if stored != computed:
+                    differences += 1
+                    self.stderr.write(
+                        f"Emisión {issuance.id}: {field} guardado={stored},"
+                        f" calculado={computed}"
+                    )
+        if differences:
+            self.stdout.write(
+                self.style.WARNING(f"{differences} diferencias.")
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("Sin diferencias."))
@@ -0,0 +1,68 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from rrgg import breakdown
+from rrgg.models import QuotationInsuranceVehiclePremium
+
+
+class Command(BaseCommand):
+    help = (  # noqa: A003
+        "Compara el desglose de primas por lotes con las propiedades del"
+        " modelo sobre primas generadas en memoria."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=100_000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        size = options["size"]
+        generator = random.Random(options["seed"])
+        premiums = [
+            QuotationInsuranceVehiclePremium(
+                amount=Decimal(generator.randint(0, 10_000_000)) / 100,
+                emission_right_percentage=Decimal(
+                    generator.choice(("0.0300", "0.0250", "0.0375"))
+                ),
+                tax_percentage=Decimal("0.1800"),
+            )
+            for _ in range(size)
+        ]
+
+        start = time.perf_counter()
+        expected = [
+            {
+                field: getattr(premium, field)
+                for field in breakdown.PREMIUM_FIELDS
+            }
+            for premium in premiums
+        ]
+        properties = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = breakdown.premium_breakdown(premiums)
+        batch = time.perf_counter() - start
+
+        if result != expected:
+            differences = sum(
+                row != reference for row, reference in zip(result, expected)
+            )
+            self.stderr.write(
+                self.style.ERROR(f"{differences} primas con montos distintos.")
+            )
+            return
+        self.stdout.write(
+            f"Propiedades: {properties:.3f} s ({size / properties:,.0f}"
+            " primas/s)"
+        )
+        self.stdout.write(
+            f"Por lotes:   {batch:.3f} s ({size / batch:,.0f} primas/s)"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Montos idénticos; {properties / batch:.1f}x más rápido."
+            )
+        )
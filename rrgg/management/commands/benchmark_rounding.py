@@ -0,0 +1,99 @@
+import random
+import timeit
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.core.management.base import BaseCommand
+
+from rrggweb.utils import to_decimal
+
+
+def legacy_to_decimal(amount):
+    # implementación anterior de rrggweb.utils.to_decimal, como referencia
+    str_amount = str(amount)
+    dot_index = str_amount.find(".")
+    if dot_index != -1:
+        str_amount = Decimal(str_amount).quantize(
+            Decimal("0.00"), rounding=ROUND_HALF_UP
+        )
+    return Decimal(str_amount)
+
+
+class Command(BaseCommand):
+    help = (  # noqa: A003
+        "Mide to_decimal frente a su implementación anterior y comprueba"
+        " que los resultados coincidan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def sample(self, size, seed):
+        generator = random.Random(seed)
+        percentages = [Decimal("0.0300"), Decimal("0.1800"), Decimal("0.15")]
+        values = [
+            # productos como los de las propiedades de los modelos
+            Decimal(generator.randint(-(10**7), 10**7))
+            / 100
+            * generator.choice(percentages)
+            for _ in range(size)
+        ]
+        # casos borde: enteros, flotantes, textos, notación científica
+        values += [
+            0,
+            125,
+            -7,
+            0.1,
+            2.675,
+            1e-05,
+            "10.005",
+            "42",
+            Decimal("5"),
+            Decimal("0E-8"),
+            Decimal("1.2E+3"),
+            Decimal("-0.005"),
+            Decimal("2.5"),
+            Decimal("NaN"),
+        ]
+        return values
+
+    def handle(self, *args, **options):
+        values = self.sample(options["size"], options["seed"])
+        mismatches = [
+            value
+            for value in values
+            if str(to_decimal(value)) != str(legacy_to_decimal(value))
+        ]
+        if mismatches:
+            self.stderr.write(
+                self.style.ERROR(f"Resultados distintos para {mismatches[:5]}")
+            )
+            return
+
+        def measure(function):
+            return min(
+                timeit.repeat(
+                    lambda: [function(value) for value in values],
+                    number=1,
+                    repeat=options["repeat"],
+                )
+            )
+
+        legacy = measure(legacy_to_decimal)
+        current = measure(to_decimal)
+        size = len(values)
+        for label, seconds in (
+            ("to_decimal anterior", legacy),
+            ("to_decimal", current),
+        ):
+            self.stdout.write(
+                f"{label:<20} {seconds:.3f} s"
+                f" ({seconds / size * 1e9:,.0f} ns por monto)"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Resultados idénticos; to_decimal {legacy / current:.1f}x"
+                " más rápido."
+            )
+        )
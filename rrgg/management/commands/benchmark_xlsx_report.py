@@ -0,0 +1,81 @@
+import io
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from rrggweb.exports import (
+    QUOTATION_REPORT_COLUMNS,
+    QUOTATION_REPORT_TEMPLATE,
+    load_template,
+)
+
+
+def legacy_template(path):
+    # lectura anterior de la plantilla en cada descarga, como referencia
+    from openpyxl import load_workbook
+
+    return load_workbook(filename=path)
+
+
+class Command(BaseCommand):
+    help = (  # noqa: A003
+        "Mide la generación del reporte XLSX de cotizaciones leyendo la"
+        " plantilla en cada descarga frente a la copia precargada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def report(self, open_template):
+        workbook = open_template(QUOTATION_REPORT_TEMPLATE)
+        ws = workbook.active
+        ws["C6"] = "JUAN PÉREZ"
+        ws["C7"] = "TOYOTA"
+        ws["C8"] = "YARIS"
+        ws["C9"] = 2020
+        ws["C10"] = "PARTICULAR"
+        ws["C11"] = Decimal("20000")
+        ws["I6"] = "01/01/2024"
+        for column in QUOTATION_REPORT_COLUMNS.values():
+            ws[f"{column}13"] = Decimal("1000")
+            ws[f"{column}14"] = Decimal("30")
+            ws[f"{column}15"] = Decimal("185.40")
+            ws[f"{column}16"] = Decimal("1215.40")
+        output = io.BytesIO()
+        workbook.save(output)
+        return output.getvalue()
+
+    def measure(self, open_template, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            self.report(open_template)
+        latency = (time.perf_counter() - start) / repeat
+        tracemalloc.start()
+        self.report(open_template)
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return latency, peak
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        # la primera llamada lee y serializa la plantilla
+        start = time.perf_counter()
+        self.report(load_template)
+        warmup = time.perf_counter() - start
+
+        results = {
+            "Leyendo la plantilla": self.measure(legacy_template, repeat),
+            "Plantilla precargada": self.measure(load_template, repeat),
+        }
+        for name, (latency, peak) in results.items():
+            self.stdout.write(
+                f"{name}: {latency * 1000:.1f} ms por reporte,"
+                f" {peak / 2**20:.1f} MiB de memoria pico"
+            )
+        self.stdout.write(f"Primera carga: {warmup * 1000:.1f} ms")
+        legacy, cached = results.values()
+        self.stdout.write(
+            self.style.SUCCESS(f"{legacy[0] / cached[0]:.1f}x más rápido.")
+        )
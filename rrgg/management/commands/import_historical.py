@@ -0,0 +1,220 @@
+import csv
+from datetime import date, datetime
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from rrgg import rollup
+from rrgg.historical import HistoricalLoader, parse_row
+from rrgg.models import HistoricalData
+
+# clave con la que se busca una fila histórica existente; no identifica
+# un registro (el origen puede repetirla), por eso las filas que comparten
+# clave se rechazan en lugar de sobrescribirse
+NATURAL_KEY = ("policy", "document_number", "year", "months")
+
+FIELDS = [
+    field.name
+    for field in HistoricalData._meta.concrete_fields
+    if not field.primary_key
+]
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return " ".join(str(value).split())
+
+
+def _header(value):
+    return "_".join(_text(value).lower().split())
+
+
+def _normalized(field, value):
+    # NULL equivale a vacío y el mes no distingue mayúsculas
+    value = value or ""
+    return value.upper() if field == "months" else value
+
+
+def _key(row):
+    return tuple(_normalized(field, row[field]) for field in NATURAL_KEY)
+
+
+class Command(BaseCommand):
+    help = (  # noqa: A003
+        "Importa data histórica desde archivos XLSX o CSV. La primera fila"
+        " debe tener los nombres de campo de HistoricalData."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", type=Path)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--sheet", help="Hoja del XLSX (por defecto la activa)."
+        )
+        parser.add_argument("--delimiter", default=",")
+
+    def handle(self, *args, **options):
+        self.chunk_size = options["chunk_size"]
+        self.loader = HistoricalLoader()
+        self.periods = set()
+        # clave -> primera fila importada con ella en esta ejecución
+        self.seen = {}
+        totals = {"created": 0, "updated": 0, "unchanged": 0, "rejected": 0}
+
+        with rollup.paused():
+            for path in options["paths"]:
+                rows = self.read(path, options)
+                fields = self.map_header(path, next(rows, []))
+                numbered = enumerate(rows, start=2)
+                while chunk := list(islice(numbered, self.chunk_size)):
+                    result = self.import_chunk(path, fields, chunk)
+                    for name, count in result.items():
+                        totals[name] += count
+                    self.stdout.write(
+                        f"{path.name}: fila {chunk[-1][0]},"
+                        f" {totals['created']} nuevas,"
+                        f" {totals['updated']} actualizadas,"
+                        f" {totals['unchanged']} sin cambios,"
+                        f" {totals['rejected']} rechazadas"
+                    )
+
+        for year, month in sorted(self.periods):
+            rollup.refresh_period(year, month)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{totals['created']} filas nuevas,"
+                f" {totals['updated']} actualizadas,"
+                f" {totals['unchanged']} sin cambios,"
+                f" {totals['rejected']} rechazadas."
+            )
+        )
+
+    def read(self, path, options):
+        if path.suffix.lower() == ".csv":
+            with path.open(newline="", encoding="utf-8-sig") as file:
+                yield from csv.reader(file, delimiter=options["delimiter"])
+        elif path.suffix.lower() == ".xlsx":
+            from openpyxl import load_workbook
+
+            workbook = load_workbook(path, read_only=True, data_only=True)
+            try:
+                sheet = (
+                    workbook[options["sheet"]]
+                    if options["sheet"]
+                    else workbook.active
+                )
+                yield from sheet.iter_rows(values_only=True)
+            finally:
+                workbook.close()
+        else:
+            raise CommandError(f"Formato no soportado: {path}")
+
+    def map_header(self, path, header):
+        fields = [_header(value) for value in header]
+        unknown = [field for field in fields if field and field not in FIELDS]
+        if unknown:
+            self.stderr.write(
+                f"{path.name}: columnas ignoradas: {', '.join(unknown)}"
+            )
+        missing = [field for field in NATURAL_KEY if field not in fields]
+        if missing:
+            raise CommandError(
+                f"{path.name}: faltan columnas: {', '.join(missing)}"
+            )
+        return fields
+
+    def build(self, path, fields, line, values):
+        data = HistoricalData(
+            **{
+                field: _text(value)
+                for field, value in zip(fields, values)
+                if field in FIELDS
+            }
+        )
+        for field in FIELDS:
+            setattr(data, field, _normalized(field, getattr(data, field)))
+        row = parse_row(data)
+        errors = dict(row.errors)
+        if not data.policy:
+            errors["policy"] = "Campo requerido"
+        if row.rejected or "policy" in errors:
+            self.stderr.write(
+                f"{path.name}:{line} rechazada: "
+                + "; ".join(
+                    f"{field}: {error}" for field, error in errors.items()
+                )
+            )
+            return None
+        self.periods.add((row.values["year"], row.values["month"]))
+        return data
+
+    @transaction.atomic
+    def import_chunk(self, path, fields, chunk):
+        by_key = {}
+        rejected = 0
+        for line, values in chunk:
+            if not any(value not in (None, "") for value in values):
+                continue
+            data = self.build(path, fields, line, values)
+            if data is None:
+                rejected += 1
+                continue
+            key = tuple(getattr(data, field) for field in NATURAL_KEY)
+            if key in self.seen:
+                self.stderr.write(
+                    f"{path.name}:{line} rechazada: misma póliza, documento,"
+                    f" año y mes que {self.seen[key]}"
+                )
+                rejected += 1
+                continue
+            self.seen[key] = f"{path.name}:{line}"
+            by_key[key] = data
+
+        existing = {}
+        for row in HistoricalData.objects.filter(
+            policy__in={key[0] for key in by_key}
+        ).values("id", *FIELDS):
+            existing.setdefault(_key(row), []).append(row)
+        to_create, to_update = [], []
+        unchanged = 0
+        for key, data in by_key.items():
+            matches = existing.get(key, [])
+            if not matches:
+                to_create.append(data)
+                continue
+            current = matches[0]
+            if len(matches) > 1:
+                self.stderr.write(
+                    f"{self.seen[key]} rechazada: {len(matches)} filas"
+                    " existentes con la misma póliza, documento, año y mes"
+                )
+                rejected += 1
+            elif all(
+                _normalized(field, current[field]) == getattr(data, field)
+                for field in FIELDS
+            ):
+                unchanged += 1
+            else:
+                data.id = current["id"]
+                to_update.append(data)
+
+        HistoricalData.objects.bulk_create(to_create)
+        HistoricalData.objects.bulk_update(to_update, FIELDS, batch_size=500)
+        ids = [data.id for data in (*to_create, *to_update)]
+        self.loader.load_all(HistoricalData.objects.filter(id__in=ids))
+        return {
+            "created": len(to_create),
+            "updated": len(to_update),
+            "unchanged": unchanged,
+            "rejected": rejected,
+        }
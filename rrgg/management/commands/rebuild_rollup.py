@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from rrgg import rollup
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el resumen mensual del dashboard."  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--period",
+            nargs=2,
+            type=int,
+            metavar=("YEAR", "MONTH"),
+            help="Solo refresca un periodo.",
+        )
+
+    def handle(self, *args, **options):
+        if options["period"]:
+            year, month = options["period"]
+            rollup.refresh_period(year, month)
+            self.stdout.write(
+                self.style.SUCCESS(f"Periodo {year}-{month:02d} refrescado.")
+            )
+            return
+        rows = rollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{rows} filas generadas."))
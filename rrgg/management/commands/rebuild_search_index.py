@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from rrgg import global_search
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de la búsqueda global."  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        created = global_search.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{created} entradas indexadas."))
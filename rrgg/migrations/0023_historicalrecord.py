@@ -0,0 +1,288 @@
+# Generated by Django 4.2.1 on 2026-10-18 11:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rrgg", "0022_alter_consultantrate_new_sale_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HistoricalConsultant",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=128, unique=True, verbose_name="name"
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="HistoricalCurrency",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=128, unique=True, verbose_name="name"
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="HistoricalInsurer",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=128, unique=True, verbose_name="name"
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="HistoricalRisk",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=128, unique=True, verbose_name="name"
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="HistoricalStatus",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=128, unique=True, verbose_name="name"
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="HistoricalRecord",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "year",
+                    models.PositiveSmallIntegerField(verbose_name="year"),
+                ),
+                (
+                    "month",
+                    models.PositiveSmallIntegerField(verbose_name="month"),
+                ),
+                (
+                    "register_date",
+                    models.DateField(null=True, verbose_name="register date"),
+                ),
+                (
+                    "issuance_date",
+                    models.DateField(null=True, verbose_name="issuance date"),
+                ),
+                (
+                    "initial_validity",
+                    models.DateField(
+                        null=True, verbose_name="initial validity"
+                    ),
+                ),
+                (
+                    "final_validity",
+                    models.DateField(null=True, verbose_name="final validity"),
+                ),
+                (
+                    "payment_date",
+                    models.DateField(null=True, verbose_name="payment date"),
+                ),
+                (
+                    "insured_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=14,
+                        null=True,
+                        verbose_name="insured amount",
+                    ),
+                ),
+                (
+                    "kcs_commission_percentage",
+                    models.DecimalField(
+                        decimal_places=4,
+                        max_digits=10,
+                        null=True,
+                        verbose_name="kcs commission percentage",
+                    ),
+                ),
+                (
+                    "net_premium",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=14,
+                        null=True,
+                        verbose_name="net premium",
+                    ),
+                ),
+                (
+                    "commercial_premium",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=14,
+                        null=True,
+                        verbose_name="commercial premium",
+                    ),
+                ),
+                (
+                    "total_premium",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=14,
+                        null=True,
+                        verbose_name="total premium",
+                    ),
+                ),
+                (
+                    "net_commission",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=14,
+                        null=True,
+                        verbose_name="net commission",
+                    ),
+                ),
+                (
+                    "consultant",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="records",
+                        to="rrgg.historicalconsultant",
+                    ),
+                ),
+                (
+                    "currency",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="records",
+                        to="rrgg.historicalcurrency",
+                    ),
+                ),
+                (
+                    "insurer",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="records",
+                        to="rrgg.historicalinsurer",
+                    ),
+                ),
+                (
+                    "risk",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="records",
+                        to="rrgg.historicalrisk",
+                    ),
+                ),
+                (
+                    "source",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="record",
+                        to="rrgg.historicaldata",
+                    ),
+                ),
+                (
+                    "status",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="records",
+                        to="rrgg.historicalstatus",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "historical record",
+                "verbose_name_plural": "historical records",
+                "indexes": [
+                    models.Index(
+                        fields=["year", "month", "currency"],
+                        name="rrgg_hist_period_currency_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,217 @@
+import logging
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+# copia de rrgg.historical a la fecha de esta migración: la migración no
+# debe cambiar si ese módulo cambia
+
+MONTHS = (
+    "ENERO",
+    "FEBRERO",
+    "MARZO",
+    "ABRIL",
+    "MAYO",
+    "JUNIO",
+    "JULIO",
+    "AGOSTO",
+    "SEPTIEMBRE",
+    "OCTUBRE",
+    "NOVIEMBRE",
+    "DICIEMBRE",
+)
+
+MONTH_NUMBERS = {name: number for number, name in enumerate(MONTHS, 1)}
+
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d/%m/%y", "%d-%m-%Y")
+
+DATE_FIELDS = (
+    "register_date",
+    "issuance_date",
+    "initial_validity",
+    "final_validity",
+    "payment_date",
+)
+
+AMOUNT_FIELDS = {
+    "insured_amount": "insured_amount",
+    "net_premium": "net_premium",
+    "commercial_premium": "commercial_premium",
+    "total_premium": "total_premium",
+    "net_commission": "net_commission_amount",
+}
+
+LOOKUP_FIELDS = {
+    "consultant": ("consultant", "HistoricalConsultant"),
+    "insurer": ("insurance_vehicle", "HistoricalInsurer"),
+    "currency": ("currency", "HistoricalCurrency"),
+    "risk": ("risk", "HistoricalRisk"),
+    "status": ("status", "HistoricalStatus"),
+}
+
+REQUIRED_FIELDS = ("year", "month", "currency")
+
+TWO_PLACES = Decimal("0.01")
+FOUR_PLACES = Decimal("0.0001")
+
+BATCH_SIZE = 1000
+
+
+def clean(value):
+    return " ".join(str(value or "").split())
+
+
+def parse_year(value):
+    value = clean(value)
+    if not value:
+        return None
+    if not value.isdigit() or not 1900 <= int(value) <= 2100:
+        raise ValueError(f"Año inválido: {value}")
+    return int(value)
+
+
+def parse_month(value):
+    value = clean(value).upper()
+    if not value:
+        return None
+    if value.isdigit() and 1 <= int(value) <= 12:
+        return int(value)
+    if value not in MONTH_NUMBERS:
+        raise ValueError(f"Mes desconocido: {value}")
+    return MONTH_NUMBERS[value]
+
+
+def parse_date(value):
+    if isinstance(value, date):
+        return value
+    value = clean(value)
+    if not value:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha inválida: {value}")
+
+
+def parse_amount(value):
+    value = clean(value).replace(",", "").replace(" ", "")
+    if not value:
+        return None
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"Monto inválido: {value}") from None
+    if not amount.is_finite():
+        raise ValueError(f"Monto inválido: {value}")
+    return amount.quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def parse_percentage(value):
+    value = clean(value).replace(" ", "")
+    if not value:
+        return None
+    is_percent = value.endswith("%")
+    try:
+        percentage = Decimal(value.rstrip("%"))
+    except InvalidOperation:
+        raise ValueError(f"Porcentaje inválido: {value}") from None
+    if is_percent or percentage > 1:
+        percentage /= 100
+    return percentage.quantize(FOUR_PLACES, rounding=ROUND_HALF_UP)
+
+
+def parse_row(data):
+    parsers = [
+        ("year", parse_year, data.year),
+        ("month", parse_month, data.months),
+        (
+            "kcs_commission_percentage",
+            parse_percentage,
+            data.kcs_commission_percentage,
+        ),
+    ]
+    parsers += [
+        (field, parse_date, getattr(data, field)) for field in DATE_FIELDS
+    ]
+    parsers += [
+        (field, parse_amount, getattr(data, source))
+        for field, source in AMOUNT_FIELDS.items()
+    ]
+    values = {}
+    errors = {}
+    for field, parser, raw in parsers:
+        try:
+            values[field] = parser(raw)
+        except ValueError as error:
+            values[field] = None
+            errors[field] = str(error)
+    labels = {
+        field: clean(getattr(data, source)).upper() or None
+        for field, (source, _model_name) in LOOKUP_FIELDS.items()
+    }
+    parsed = {**values, **labels}
+    for field in REQUIRED_FIELDS:
+        if parsed[field] is None:
+            errors.setdefault(field, "Campo requerido")
+    return values, labels, errors
+
+
+def backfill(apps, schema_editor):
+    historical_data = apps.get_model("rrgg", "HistoricalData")
+    record_model = apps.get_model("rrgg", "HistoricalRecord")
+    lookup_models = {
+        field: apps.get_model("rrgg", model_name)
+        for field, (_source, model_name) in LOOKUP_FIELDS.items()
+    }
+    lookup_ids = {field: {} for field in LOOKUP_FIELDS}
+
+    def lookup_id(field, name):
+        if name is None:
+            return None
+        if name not in lookup_ids[field]:
+            instance, _ = lookup_models[field].objects.get_or_create(name=name)
+            lookup_ids[field][name] = instance.id
+        return lookup_ids[field][name]
+
+    record_model.objects.all().delete()
+    batch = []
+    loaded = rejected = 0
+    queryset = historical_data.objects.order_by("id")
+    for data in queryset.iterator(chunk_size=BATCH_SIZE):
+        values, labels, errors = parse_row(data)
+        if any(field in errors for field in REQUIRED_FIELDS):
+            rejected += 1
+            logger.warning("HistoricalData %s rechazado: %s", data.id, errors)
+            continue
+        for field, name in labels.items():
+            values[f"{field}_id"] = lookup_id(field, name)
+        batch.append(record_model(source_id=data.id, **values))
+        if len(batch) >= BATCH_SIZE:
+            record_model.objects.bulk_create(batch)
+            loaded += len(batch)
+            batch = []
+    record_model.objects.bulk_create(batch)
+    logger.info(
+        "Data histórica: %d registros cargados, %d rechazados",
+        loaded + len(batch),
+        rejected,
+    )
+
+
+def unload(apps, schema_editor):
+    apps.get_model("rrgg", "HistoricalRecord").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rrgg", "0023_historicalrecord"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, unload),
+    ]
@@ -0,0 +1,193 @@
+# Generated by Django 4.2.1 on 2026-10-18 11:45
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+# copia de rrgg.rollup.RollupBuilder.rebuild a la fecha de esta migración
+
+
+def seller_name(item):
+    if item["seller_given_name"] is None:
+        return ""
+    return f"{item['seller_given_name']} {item['seller_first_surname']}"
+
+
+def build(apps, schema_editor):
+    rollup_model = apps.get_model("rrgg", "MonthlyRollup")
+    record_model = apps.get_model("rrgg", "HistoricalRecord")
+    premium_model = apps.get_model("rrgg", "QuotationInsuranceVehiclePremium")
+    issuance_model = apps.get_model("rrgg", "IssuanceInsuranceVehicle")
+    rows = {}
+
+    def row(key):
+        if key not in rows:
+            year, month, currency, insurer, consultant = key
+            rows[key] = rollup_model(
+                year=year,
+                month=month,
+                currency=currency,
+                insurer=insurer,
+                consultant=consultant,
+            )
+        return rows[key]
+
+    historical = record_model.objects.values(
+        "year",
+        "month",
+        currency_name=F("currency__name"),
+        insurer_name=F("insurer__name"),
+        consultant_name=F("consultant__name"),
+    ).annotate(
+        net_premium_sum=Sum("net_premium"),
+        net_commission_sum=Sum("net_commission"),
+    )
+    for item in historical.order_by():
+        current = row(
+            (
+                item["year"],
+                item["month"],
+                item["currency_name"] or "",
+                item["insurer_name"] or "",
+                item["consultant_name"] or "",
+            )
+        )
+        for field in ("net_premium", "net_commission"):
+            amount = item[f"{field}_sum"]
+            if amount is not None:
+                total = getattr(current, field) or Decimal(0)
+                setattr(current, field, total + amount)
+
+    quotation = "quotation_insurance_vehicle__"
+    quotations = premium_model.objects.values(
+        period_year=ExtractYear("created"),
+        period_month=ExtractMonth("created"),
+        currency_name=F(f"{quotation}currency__name"),
+        insurer_name=F("insurance_vehicle_ratio__insurance_vehicle__name"),
+        seller_given_name=F(f"{quotation}consultant_seller__given_name"),
+        seller_first_surname=F(f"{quotation}consultant_seller__first_surname"),
+    ).annotate(total=Count("id"))
+    premium = "quotation_vehicle_premiums__"
+    issuances = issuance_model.objects.values(
+        period_year=ExtractYear("created"),
+        period_month=ExtractMonth("created"),
+        currency_name=F(
+            f"{premium}quotation_insurance_vehicle__currency__name"
+        ),
+        insurer_name=F(
+            f"{premium}insurance_vehicle_ratio__insurance_vehicle__name"
+        ),
+        seller_given_name=F("consultant_seller__given_name"),
+        seller_first_surname=F("consultant_seller__first_surname"),
+    ).annotate(total=Count("id", distinct=True))
+    for aggregates, field in (
+        (quotations, "quotation_count"),
+        (issuances, "issuance_count"),
+    ):
+        for item in aggregates.order_by():
+            current = row(
+                (
+                    item["period_year"],
+                    item["period_month"],
+                    item["currency_name"] or "",
+                    item["insurer_name"] or "",
+                    seller_name(item),
+                )
+            )
+            setattr(current, field, getattr(current, field) + item["total"])
+
+    rollup_model.objects.all().delete()
+    rollup_model.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rrgg", "0024_backfill_historicalrecord"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "year",
+                    models.PositiveSmallIntegerField(verbose_name="year"),
+                ),
+                (
+                    "month",
+                    models.PositiveSmallIntegerField(verbose_name="month"),
+                ),
+                (
+                    "currency",
+                    models.CharField(
+                        blank=True, max_length=128, verbose_name="currency"
+                    ),
+                ),
+                (
+                    "insurer",
+                    models.CharField(
+                        blank=True, max_length=128, verbose_name="insurer"
+                    ),
+                ),
+                (
+                    "consultant",
+                    models.CharField(
+                        blank=True, max_length=128, verbose_name="consultant"
+                    ),
+                ),
+                (
+                    "net_premium",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=16,
+                        null=True,
+                        verbose_name="net premium",
+                    ),
+                ),
+                (
+                    "net_commission",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=16,
+                        null=True,
+                        verbose_name="net commission",
+                    ),
+                ),
+                (
+                    "quotation_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="quotation count"
+                    ),
+                ),
+                (
+                    "issuance_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="issuance count"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "monthly rollup",
+                "verbose_name_plural": "monthly rollups",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="monthlyrollup",
+            constraint=models.UniqueConstraint(
+                fields=("year", "month", "currency", "insurer", "consultant"),
+                name="rrgg_monthly_rollup_key",
+            ),
+        ),
+        migrations.RunPython(build, migrations.RunPython.noop),
+    ]
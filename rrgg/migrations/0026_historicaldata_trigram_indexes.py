@@ -0,0 +1,56 @@
+# Generated by Django 4.2.1 on 2026-10-18 11:48
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rrgg", "0025_monthlyrollup"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="historicaldata",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("customer"),
+                    name="gin_trgm_ops",
+                ),
+                name="rrgg_hist_customer_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="historicaldata",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("document_number"),
+                    name="gin_trgm_ops",
+                ),
+                name="rrgg_hist_document_number_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="historicaldata",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("policy"),
+                    name="gin_trgm_ops",
+                ),
+                name="rrgg_hist_policy_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="historicaldata",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("consultant"),
+                    name="gin_trgm_ops",
+                ),
+                name="rrgg_hist_consultant_trgm",
+            ),
+        ),
+    ]
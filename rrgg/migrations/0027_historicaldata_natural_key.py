@@ -0,0 +1,19 @@
+# Generated by Django 4.2.1 on 2026-10-18 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rrgg", "0026_historicaldata_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="historicaldata",
+            index=models.Index(
+                fields=["policy", "document_number", "year", "months"],
+                name="rrgg_hist_natural_key_idx",
+            ),
+        ),
+    ]
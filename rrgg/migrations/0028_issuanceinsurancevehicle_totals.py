@@ -0,0 +1,186 @@
+# Generated by Django 4.2.1 on 2026-10-18 11:54
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+
+# copia de rrgg.totals y rrggweb.utils.to_decimal a la fecha de esta
+# migración
+
+BATCH_SIZE = 500
+
+TWO_PLACES = Decimal("0.01")
+
+TOTAL_FIELDS = (
+    "insured_amount",
+    "net_premium",
+    "emission_right",
+    "commercial_premium",
+    "tax",
+    "total_premium",
+    "net_commission",
+    "seller_commission",
+    "kcs_commission",
+)
+
+
+def to_decimal(amount):
+    str_amount = str(amount)
+    if "." in str_amount:
+        return Decimal(str_amount).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+    return Decimal(str_amount)
+
+
+def compute_totals(issuance, premiums):
+    amount = sum(premium.amount for premium in premiums)
+    net_premium = to_decimal(amount)
+    if premiums:
+        first = premiums[0]
+        emission_right = to_decimal(
+            net_premium * first.emission_right_percentage
+        )
+        tax_percentage = first.tax_percentage
+    else:
+        emission_right = tax_percentage = Decimal(0)
+    commercial_premium = to_decimal(net_premium + emission_right)
+    tax = to_decimal(commercial_premium * tax_percentage)
+    net_commission = to_decimal(amount * issuance.plan_commission_percentage)
+    seller_commission = to_decimal(
+        issuance.seller_commission_percentage * net_commission
+    )
+    return {
+        "insured_amount": to_decimal(
+            sum(
+                premium.quotation_insurance_vehicle.insured_amount
+                for premium in premiums
+            )
+        ),
+        "net_premium": net_premium,
+        "emission_right": emission_right,
+        "commercial_premium": commercial_premium,
+        "tax": tax,
+        "total_premium": commercial_premium + tax,
+        "net_commission": net_commission,
+        "seller_commission": seller_commission,
+        "kcs_commission": to_decimal(net_commission - seller_commission),
+    }
+
+
+def backfill(apps, schema_editor):
+    model = apps.get_model("rrgg", "IssuanceInsuranceVehicle")
+    queryset = model.objects.prefetch_related(
+        "quotation_vehicle_premiums__quotation_insurance_vehicle"
+    ).order_by("id")
+    batch = []
+    for issuance in queryset.iterator(chunk_size=BATCH_SIZE):
+        premiums = sorted(
+            issuance.quotation_vehicle_premiums.all(),
+            key=lambda premium: premium.id,
+        )
+        for field, value in compute_totals(issuance, premiums).items():
+            setattr(issuance, field, value)
+        batch.append(issuance)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_update(batch, TOTAL_FIELDS)
+            batch = []
+    model.objects.bulk_update(batch, TOTAL_FIELDS)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rrgg", "0027_historicaldata_natural_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="issuanceinsurancevehicle",
+            name="commercial_premium",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                max_digits=12,
+                verbose_name="commercial premium",
+            ),
+        ),
+        migrations.AddField(
+            model_name="issuanceinsurancevehicle",
+            name="emission_right",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                max_digits=12,
+                verbose_name="emission right",
+            ),
+        ),
+        migrations.AddField(
+            model_name="issuanceinsurancevehicle",
+            name="insured_amount",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                max_digits=12,
+                verbose_name="insured amount",
+            ),
+        ),
+        migrations.AddField(
+            model_name="issuanceinsurancevehicle",
+            name="kcs_commission",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                max_digits=12,
+                verbose_name="kcs commission",
+            ),
+        ),
+        migrations.AddField(
+            model_name="issuanceinsurancevehicle",
+            name="net_commission",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                max_digits=12,
+                verbose_name="net commission",
+            ),
+        ),
+        migrations.AddField(
+            model_name="issuanceinsurancevehicle",
+            name="net_premium",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                max_digits=12,
+                verbose_name="net premium",
+            ),
+        ),
+        migrations.AddField(
+            model_name="issuanceinsurancevehicle",
+            name="seller_commission",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                max_digits=12,
+                verbose_name="seller commission",
+            ),
+        ),
+        migrations.AddField(
+            model_name="issuanceinsurancevehicle",
+            name="tax",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                max_digits=12,
+                verbose_name="tax (igv)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="issuanceinsurancevehicle",
+            name="total_premium",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                max_digits=12,
+                verbose_name="total premium",
+            ),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
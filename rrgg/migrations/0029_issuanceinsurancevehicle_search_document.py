@@ -0,0 +1,129 @@
+# Generated by Django 4.2.1 on 2026-10-18 11:56
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Prefetch
+
+# copia de rrgg.search a la fecha de esta migración
+
+BATCH_SIZE = 500
+
+PREMIUM_RELATED = (
+    "insurance_vehicle_ratio__insurance_vehicle",
+    "quotation_insurance_vehicle__customer__natural_person",
+    "quotation_insurance_vehicle__customer__legal_person",
+    "quotation_insurance_vehicle__vehicle",
+)
+
+ISSUANCE_RELATED = (
+    "consultant_seller",
+    "status",
+    "issuance_type",
+    "payment_method",
+)
+
+
+def person_terms(customer):
+    if customer.natural_person:
+        person = customer.natural_person
+        return [
+            person.given_name,
+            person.first_surname,
+            person.second_surname,
+            person.document_number,
+        ]
+    if customer.legal_person:
+        person = customer.legal_person
+        return [
+            person.registered_name,
+            person.general_manager,
+            person.document_number,
+        ]
+    return []
+
+
+def join_words(terms):
+    words = []
+    for term in terms:
+        for word in str(term or "").upper().split():
+            if word not in words:
+                words.append(word)
+    return " ".join(words)
+
+
+def build_document(issuance, premiums):
+    terms = [
+        issuance.policy,
+        issuance.collection_document,
+        issuance.issuance_date,
+        issuance.initial_validity,
+        issuance.final_validity,
+        issuance.issuance_type.name,
+        issuance.payment_method.name,
+        issuance.consultant_seller.given_name,
+        issuance.consultant_seller.first_surname,
+        issuance.status.name if issuance.status_id else None,
+    ]
+    for premium in premiums:
+        quotation = premium.quotation_insurance_vehicle
+        terms += person_terms(quotation.customer)
+        terms += [
+            quotation.vehicle.plate,
+            premium.insurance_vehicle_ratio.insurance_vehicle.name,
+        ]
+    return join_words(terms)
+
+
+def backfill(apps, schema_editor):
+    model = apps.get_model("rrgg", "IssuanceInsuranceVehicle")
+    premium_model = apps.get_model("rrgg", "QuotationInsuranceVehiclePremium")
+    queryset = (
+        model.objects.select_related(*ISSUANCE_RELATED)
+        .prefetch_related(
+            Prefetch(
+                "quotation_vehicle_premiums",
+                premium_model.objects.select_related(
+                    *PREMIUM_RELATED
+                ).order_by("id"),
+            )
+        )
+        .order_by("id")
+    )
+    batch = []
+    for issuance in queryset.iterator(chunk_size=BATCH_SIZE):
+        issuance.search_document = build_document(
+            issuance, issuance.quotation_vehicle_premiums.all()
+        )
+        batch.append(issuance)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_update(batch, ["search_document"])
+            batch = []
+    model.objects.bulk_update(batch, ["search_document"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rrgg", "0028_issuanceinsurancevehicle_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="issuanceinsurancevehicle",
+            name="search_document",
+            field=models.TextField(
+                blank=True, default="", verbose_name="search document"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="issuanceinsurancevehicle",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("search_document"),
+                    name="gin_trgm_ops",
+                ),
+                name="rrgg_iiv_search_trgm",
+            ),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
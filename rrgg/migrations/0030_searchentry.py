@@ -0,0 +1,261 @@
+# Generated by Django 4.2.1 on 2026-10-18 12:04
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# copia de rrgg.global_search y rrgg.search a la fecha de esta migración
+
+BATCH_SIZE = 500
+
+
+def person_terms(customer):
+    if customer.natural_person:
+        person = customer.natural_person
+        return [
+            person.given_name,
+            person.first_surname,
+            person.second_surname,
+            person.document_number,
+        ]
+    if customer.legal_person:
+        person = customer.legal_person
+        return [
+            person.registered_name,
+            person.general_manager,
+            person.document_number,
+        ]
+    return []
+
+
+def join_words(terms):
+    words = []
+    for term in terms:
+        for word in str(term or "").upper().split():
+            if word not in words:
+                words.append(word)
+    return " ".join(words)
+
+
+def _full_name(person):
+    return " ".join(
+        filter(
+            None,
+            [person.given_name, person.first_surname, person.second_surname],
+        )
+    )
+
+
+def _customer_name(customer):
+    if customer.natural_person:
+        return _full_name(customer.natural_person)
+    if customer.legal_person:
+        return customer.legal_person.registered_name
+    return ""
+
+
+def _membership_id(person):
+    # la relación inversa no existe para propietarios que no son clientes
+    membership = getattr(person, "membership", None)
+    return membership.id if membership else None
+
+
+def _natural_person(person):
+    name = _full_name(person)
+    return {
+        "title": name,
+        "subtitle": person.document_number,
+        "link_id": _membership_id(person),
+        "document": join_words(
+            [
+                name,
+                person.document_number,
+                person.email,
+                person.phone_number,
+            ]
+        ),
+    }
+
+
+def _legal_person(person):
+    return {
+        "title": person.registered_name,
+        "subtitle": person.document_number,
+        "link_id": _membership_id(person),
+        "document": join_words(
+            [
+                person.registered_name,
+                person.general_manager,
+                person.document_number,
+                person.email,
+                person.phone_number,
+            ]
+        ),
+    }
+
+
+def _vehicle(vehicle):
+    return {
+        "title": vehicle.plate or "",
+        "subtitle": (
+            f"{vehicle.brand} {vehicle.vehicle_model}"
+            f" {vehicle.fabrication_year}"
+        ),
+        "document": join_words(
+            [
+                vehicle.plate,
+                vehicle.brand,
+                vehicle.vehicle_model,
+                vehicle.engine,
+                vehicle.chassis,
+            ]
+        ),
+    }
+
+
+def _quotation(quotation):
+    seller = quotation.consultant_seller
+    return {
+        "title": f"Cotización {quotation.id}",
+        "subtitle": (
+            f"{_customer_name(quotation.customer)} -"
+            f" {quotation.vehicle.plate or ''}"
+        ),
+        "document": join_words(
+            [
+                quotation.id,
+                *person_terms(quotation.customer),
+                quotation.vehicle.plate,
+                seller.given_name if seller else None,
+                seller.first_surname if seller else None,
+            ]
+        ),
+    }
+
+
+def _issuance(issuance):
+    return {
+        "title": f"Póliza {issuance.policy}",
+        "subtitle": f"{issuance.issuance_date} - {issuance.status.name}",
+        "document": join_words([issuance.id, issuance.search_document]),
+    }
+
+
+# tipo -> (modelo, relaciones a cargar, constructor de la entrada)
+KINDS = {
+    "natural_person": ("NaturalPerson", ("membership",), _natural_person),
+    "legal_person": ("LegalPerson", ("membership",), _legal_person),
+    "vehicle": ("Vehicle", (), _vehicle),
+    "quotation": (
+        "QuotationInsuranceVehicle",
+        (
+            "customer__natural_person",
+            "customer__legal_person",
+            "vehicle",
+            "consultant_seller",
+        ),
+        _quotation,
+    ),
+    "issuance": ("IssuanceInsuranceVehicle", ("status",), _issuance),
+}
+
+
+def _entries(entry_model, kind, objects):
+    build = KINDS[kind][2]
+    for obj in objects:
+        yield entry_model(kind=kind, object_id=obj.id, **build(obj))
+
+
+def rebuild(apps, schema_editor):
+    entry_model = apps.get_model("rrgg", "SearchEntry")
+    entry_model.objects.all().delete()
+    for kind, (model_name, related, _build) in KINDS.items():
+        model = apps.get_model("rrgg", model_name)
+        objects = (
+            model.objects.select_related(*related)
+            .order_by("id")
+            .iterator(chunk_size=BATCH_SIZE)
+        )
+        batch = []
+        for entry in _entries(entry_model, kind, objects):
+            batch.append(entry)
+            if len(batch) >= BATCH_SIZE:
+                entry_model.objects.bulk_create(batch)
+                batch = []
+        entry_model.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rrgg", "0029_issuanceinsurancevehicle_search_document"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("natural_person", "natural persons"),
+                            ("legal_person", "legal persons"),
+                            ("vehicle", "vehicles"),
+                            ("quotation", "quotations"),
+                            ("issuance", "issuances"),
+                        ],
+                        max_length=32,
+                        verbose_name="kind",
+                    ),
+                ),
+                (
+                    "object_id",
+                    models.BigIntegerField(verbose_name="object id"),
+                ),
+                (
+                    "title",
+                    models.CharField(max_length=255, verbose_name="title"),
+                ),
+                (
+                    "subtitle",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="subtitle"
+                    ),
+                ),
+                (
+                    "link_id",
+                    models.BigIntegerField(null=True, verbose_name="link id"),
+                ),
+                ("document", models.TextField(verbose_name="search document")),
+            ],
+            options={
+                "verbose_name": "search entry",
+                "verbose_name_plural": "search entries",
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        django.contrib.postgres.indexes.OpClass(
+                            django.db.models.functions.text.Upper("document"),
+                            name="gin_trgm_ops",
+                        ),
+                        name="rrgg_search_entry_trgm",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="searchentry",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "object_id"), name="rrgg_search_entry_key"
+            ),
+        ),
+        migrations.RunPython(rebuild, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 4.2.1 on 2026-10-18 12:07
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rrgg", "0030_searchentry"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="legalperson",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("registered_name"),
+                    name="gin_trgm_ops",
+                ),
+                name="rrgg_lp_registered_name_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="legalperson",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("general_manager"),
+                    name="gin_trgm_ops",
+                ),
+                name="rrgg_lp_general_manager_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="legalperson",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("document_number"),
+                    name="text_pattern_ops",
+                ),
+                name="rrgg_lp_document_prefix",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="naturalperson",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("given_name"),
+                    name="gin_trgm_ops",
+                ),
+                name="rrgg_np_given_name_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="naturalperson",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("first_surname"),
+                    name="gin_trgm_ops",
+                ),
+                name="rrgg_np_first_surname_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="naturalperson",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("second_surname"),
+                    name="gin_trgm_ops",
+                ),
+                name="rrgg_np_second_surname_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="naturalperson",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("document_number"),
+                    name="text_pattern_ops",
+                ),
+                name="rrgg_np_document_prefix",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.1 on 2026-10-18 12:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_issuances(apps, schema_editor):
+    # los endosos existentes se asignan a la última emisión del vehículo
+    # registrada antes del endoso
+    endorsement_model = apps.get_model("rrgg", "EndorsementVehicle")
+    issuance_model = apps.get_model("rrgg", "IssuanceInsuranceVehicle")
+    for endorsement in endorsement_model.objects.filter(issuance=None):
+        issuances = issuance_model.objects.filter(
+            quotation_vehicle_premiums__quotation_insurance_vehicle__vehicle=(
+                endorsement.vehicle_id
+            ),
+            created__lte=endorsement.created,
+        )
+        issuance = issuances.order_by("-created").first()
+        if issuance is not None:
+            endorsement.issuance = issuance
+            endorsement.save(update_fields=["issuance"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rrgg", "0031_person_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="endorsementvehicle",
+            name="issuance",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="endorsements",
+                to="rrgg.issuanceinsurancevehicle",
+                verbose_name="issuance",
+            ),
+        ),
+        migrations.RunPython(link_issuances, migrations.RunPython.noop),
+    ]
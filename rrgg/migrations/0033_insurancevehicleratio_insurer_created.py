@@ -0,0 +1,19 @@
+# Generated by Django 4.2.1 on 2026-10-18 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rrgg", "0032_endorsementvehicle_issuance"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="insurancevehicleratio",
+            index=models.Index(
+                fields=["insurance_vehicle", "created"],
+                name="rrgg_ivr_insurer_created",
+            ),
+        ),
+    ]
@@ -1,11 +1,13 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from rrggweb.utils import to_decimal
 
-from . import validators
+from . import breakdown, pricing, totals, validators
 
 
 class Role(models.Model):
@@ -139,6 +141,22 @@ class NaturalPerson(Person):
     )
     birthdate = models.DateField(_("birthdate"))
 
+    class Meta:
+        # búsqueda del listado de clientes: nombres por contenido y
+        # documento por prefijo
+        indexes = [
+            GinIndex(
+                OpClass(Upper(field), name="gin_trgm_ops"),
+                name=f"rrgg_np_{field}_trgm",
+            )
+            for field in ("given_name", "first_surname", "second_surname")
+        ] + [
+            models.Index(
+                OpClass(Upper("document_number"), name="text_pattern_ops"),
+                name="rrgg_np_document_prefix",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.given_name} {self.first_surname} {self.second_surname}"
 
@@ -151,6 +169,20 @@ class LegalPerson(Person):
     )
     anniversary_date = models.DateField(_("anniversary date"), null=True)
 
+    class Meta:
+        indexes = [
+            GinIndex(
+                OpClass(Upper(field), name="gin_trgm_ops"),
+                name=f"rrgg_lp_{field}_trgm",
+            )
+            for field in ("registered_name", "general_manager")
+        ] + [
+            models.Index(
+                OpClass(Upper("document_number"), name="text_pattern_ops"),
+                name="rrgg_lp_document_prefix",
+            ),
+        ]
+
     def __str__(self):
         return self.registered_name
 
@@ -310,7 +342,8 @@ class InsuranceVehicle(models.Model):
 
     @property
     def last_ratio(self):
-        return self.ratios.order_by("-created").first()
+        # cacheado en el proceso (ver rrgg.pricing)
+        return pricing.current_ratio(self.id)
 
     class Meta:
         verbose_name = _("vehicle insurance")
@@ -334,6 +367,13 @@ class InsuranceVehicleRatio(models.Model):
     class Meta:
         verbose_name = _("vehicle insurance ratio")
         verbose_name_plural = _("vehicle insurance ratios")
+        indexes = [
+            # ratio vigente en una fecha (ver rrgg.pricing.ratios_as_of)
+            models.Index(
+                fields=["insurance_vehicle", "created"],
+                name="rrgg_ivr_insurer_created",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.insurance_vehicle}"
@@ -444,6 +484,12 @@ class QuotationInsuranceVehicle(QuotationInsurance):
         return f"suma asegurada={self.insured_amount}, vehículo={self.vehicle}"
 
 
+class QuotationInsuranceVehiclePremiumQuerySet(models.QuerySet):
+    def with_breakdown(self):
+        """Anota el desglose de la prima como ``computed_<campo>``."""
+        return self.annotate(**breakdown.breakdown_expressions())
+
+
 class QuotationInsuranceVehiclePremium(models.Model):
     # prima neta
     amount = models.DecimalField(
@@ -478,6 +524,8 @@ class QuotationInsuranceVehiclePremium(models.Model):
     )
     created = models.DateTimeField(_("created at"), auto_now_add=True)
 
+    objects = QuotationInsuranceVehiclePremiumQuerySet.as_manager()
+
     @property
     def emission_right(self):
         amount = self.amount * self.emission_right_percentage
@@ -624,71 +672,67 @@ class IssuanceInsurance(models.Model):
         verbose_name_plural = _("issues insurance vehicle")
 
 
+class IssuanceInsuranceVehicleQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Anota los montos calculados como ``computed_<campo>``."""
+        return self.annotate(
+            **totals.total_expressions(QuotationInsuranceVehiclePremium)
+        )
+
+
 class IssuanceInsuranceVehicle(IssuanceInsurance):
     quotation_vehicle_premiums = models.ManyToManyField(
         QuotationInsuranceVehiclePremium,
         related_name="issuances",
     )
 
-    @property
-    def insured_amount(self):
-        premiums = self.quotation_vehicle_premiums.all()
-        quotations = []
-        for premium in premiums:
-            quotations.append(premium.quotation_insurance_vehicle)
-        amount = sum(quotation.insured_amount for quotation in quotations)
-        return to_decimal(amount)
+    # montos calculados a partir de las primas (ver rrgg.totals)
+    insured_amount = models.DecimalField(
+        _("insured amount"), decimal_places=2, max_digits=12, default=0
+    )
+    net_premium = models.DecimalField(
+        _("net premium"), decimal_places=2, max_digits=12, default=0
+    )
+    emission_right = models.DecimalField(
+        _("emission right"), decimal_places=2, max_digits=12, default=0
+    )
+    commercial_premium = models.DecimalField(
+        _("commercial premium"), decimal_places=2, max_digits=12, default=0
+    )
+    tax = models.DecimalField(
+        _("tax (igv)"), decimal_places=2, max_digits=12, default=0
+    )
+    total_premium = models.DecimalField(
+        _("total premium"), decimal_places=2, max_digits=12, default=0
+    )
+    net_commission = models.DecimalField(
+        _("net commission"), decimal_places=2, max_digits=12, default=0
+    )
+    seller_commission = models.DecimalField(
+        _("seller commission"), decimal_places=2, max_digits=12, default=0
+    )
+    kcs_commission = models.DecimalField(
+        _("kcs commission"), decimal_places=2, max_digits=12, default=0
+    )
+    # texto de búsqueda (ver rrgg.search)
+    search_document = models.TextField(
+        _("search document"), blank=True, default=""
+    )
 
-    @property
-    def net_premium(self):
-        premiums = self.quotation_vehicle_premiums.all()
-        amount = sum(premium.amount for premium in premiums)
-        return to_decimal(amount)
+    objects = IssuanceInsuranceVehicleQuerySet.as_manager()
+
+    class Meta(IssuanceInsurance.Meta):
+        indexes = [
+            GinIndex(
+                OpClass(Upper("search_document"), name="gin_trgm_ops"),
+                name="rrgg_iiv_search_trgm",
+            ),
+        ]
 
     @property
     def rate(self):
         return self.net_premium / self.insured_amount
 
-    @property
-    def emission_right(self):
-        premium = self.quotation_vehicle_premiums.first()
-        amount = self.net_premium * premium.emission_right_percentage
-        return to_decimal(amount)
-
-    @property
-    def commercial_premium(self):
-        amount = self.net_premium + self.emission_right
-        return to_decimal(amount)
-
-    @property
-    def tax(self):
-        premium = self.quotation_vehicle_premiums.first()
-        amount = self.commercial_premium * premium.tax_percentage
-        return to_decimal(amount)
-
-    @property
-    def total_premium(self):
-        return self.commercial_premium + self.tax
-
-    @property
-    def net_commission(self):
-        premiums = self.quotation_vehicle_premiums.all()
-        amount = (
-            sum(premium.amount for premium in premiums)
-            * self.plan_commission_percentage
-        )  # noqa
-        return to_decimal(amount)
-
-    @property
-    def seller_commission(self):
-        amount = self.seller_commission_percentage * self.net_commission
-        return to_decimal(amount)
-
-    @property
-    def kcs_commission(self):
-        amount = self.net_commission - self.seller_commission
-        return to_decimal(amount)
-
 
 class IssuanceInsuranceVehicleDocument(models.Model):
     issuance = models.ForeignKey(
@@ -802,6 +846,14 @@ class EndorsementVehicle(Endorsement):
         related_name="endorsements",
         on_delete=models.CASCADE,
     )
+    # emisión endosada; su asesor recibe la comisión del endoso
+    issuance = models.ForeignKey(
+        IssuanceInsuranceVehicle,
+        related_name="endorsements",
+        verbose_name=_("issuance"),
+        on_delete=models.PROTECT,
+        null=True,
+    )
 
 
 class CollectionInsuranceVehicle(models.Model):
@@ -890,3 +942,214 @@ class HistoricalData(models.Model):
     policy_address = models.CharField(max_length=128, null=True)
     phone_number = models.CharField(max_length=128, null=True)
     phone_number2 = models.CharField(max_length=128, null=True)
+
+    class Meta:
+        # índices trigram para las búsquedas icontains del listado
+        indexes = [
+            GinIndex(
+                OpClass(Upper(field), name="gin_trgm_ops"),
+                name=f"rrgg_hist_{field}_trgm",
+            )
+            for field in (
+                "customer",
+                "document_number",
+                "policy",
+                "consultant",
+            )
+        ] + [
+            # clave natural usada por import_historical
+            models.Index(
+                fields=["policy", "document_number", "year", "months"],
+                name="rrgg_hist_natural_key_idx",
+            ),
+        ]
+
+
+# Data histórica tipada: las cadenas repetidas se codifican en tablas de
+# búsqueda y los montos, fechas y periodos se guardan con su tipo real para
+# que el dashboard pueda usar índices en lugar de convertir texto.
+
+
+class HistoricalLookup(models.Model):
+    name = models.CharField(_("name"), max_length=128, unique=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.name
+
+
+class HistoricalConsultant(HistoricalLookup):
+    pass
+
+
+class HistoricalInsurer(HistoricalLookup):
+    pass
+
+
+class HistoricalCurrency(HistoricalLookup):
+    pass
+
+
+class HistoricalRisk(HistoricalLookup):
+    pass
+
+
+class HistoricalStatus(HistoricalLookup):
+    pass
+
+
+class HistoricalRecord(models.Model):
+    source = models.OneToOneField(
+        HistoricalData,
+        related_name="record",
+        on_delete=models.CASCADE,
+    )
+    year = models.PositiveSmallIntegerField(_("year"))
+    month = models.PositiveSmallIntegerField(_("month"))
+    register_date = models.DateField(_("register date"), null=True)
+    issuance_date = models.DateField(_("issuance date"), null=True)
+    initial_validity = models.DateField(_("initial validity"), null=True)
+    final_validity = models.DateField(_("final validity"), null=True)
+    payment_date = models.DateField(_("payment date"), null=True)
+    consultant = models.ForeignKey(
+        HistoricalConsultant,
+        related_name="records",
+        on_delete=models.PROTECT,
+        null=True,
+    )
+    insurer = models.ForeignKey(
+        HistoricalInsurer,
+        related_name="records",
+        on_delete=models.PROTECT,
+        null=True,
+    )
+    currency = models.ForeignKey(
+        HistoricalCurrency,
+        related_name="records",
+        on_delete=models.PROTECT,
+    )
+    risk = models.ForeignKey(
+        HistoricalRisk,
+        related_name="records",
+        on_delete=models.PROTECT,
+        null=True,
+    )
+    status = models.ForeignKey(
+        HistoricalStatus,
+        related_name="records",
+        on_delete=models.PROTECT,
+        null=True,
+    )
+    insured_amount = models.DecimalField(
+        _("insured amount"), decimal_places=2, max_digits=14, null=True
+    )
+    kcs_commission_percentage = models.DecimalField(
+        _("kcs commission percentage"),
+        decimal_places=4,
+        max_digits=10,
+        null=True,
+    )
+    net_premium = models.DecimalField(
+        _("net premium"), decimal_places=2, max_digits=14, null=True
+    )
+    commercial_premium = models.DecimalField(
+        _("commercial premium"), decimal_places=2, max_digits=14, null=True
+    )
+    total_premium = models.DecimalField(
+        _("total premium"), decimal_places=2, max_digits=14, null=True
+    )
+    net_commission = models.DecimalField(
+        _("net commission"), decimal_places=2, max_digits=14, null=True
+    )
+
+    class Meta:
+        verbose_name = _("historical record")
+        verbose_name_plural = _("historical records")
+        indexes = [
+            models.Index(
+                fields=["year", "month", "currency"],
+                name="rrgg_hist_period_currency_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.source_id} ({self.year}-{self.month:02d})"
+
+
+# Resumen mensual para el dashboard. Las etiquetas se guardan como texto
+# porque provienen tanto de la data histórica como de las tablas operativas.
+
+
+class MonthlyRollup(models.Model):
+    year = models.PositiveSmallIntegerField(_("year"))
+    month = models.PositiveSmallIntegerField(_("month"))
+    currency = models.CharField(_("currency"), max_length=128, blank=True)
+    insurer = models.CharField(_("insurer"), max_length=128, blank=True)
+    consultant = models.CharField(_("consultant"), max_length=128, blank=True)
+    # None cuando ninguna fila de origen tiene monto
+    net_premium = models.DecimalField(
+        _("net premium"), decimal_places=2, max_digits=16, null=True
+    )
+    net_commission = models.DecimalField(
+        _("net commission"), decimal_places=2, max_digits=16, null=True
+    )
+    quotation_count = models.PositiveIntegerField(
+        _("quotation count"), default=0
+    )
+    issuance_count = models.PositiveIntegerField(
+        _("issuance count"), default=0
+    )
+
+    class Meta:
+        verbose_name = _("monthly rollup")
+        verbose_name_plural = _("monthly rollups")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["year", "month", "currency", "insurer", "consultant"],
+                name="rrgg_monthly_rollup_key",
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.year}-{self.month:02d} {self.currency} {self.insurer}"
+            f" {self.consultant}"
+        )
+
+
+# búsqueda global (ver rrgg.global_search)
+class SearchEntry(models.Model):
+    class Kind(models.TextChoices):
+        NATURAL_PERSON = "natural_person", _("natural persons")
+        LEGAL_PERSON = "legal_person", _("legal persons")
+        VEHICLE = "vehicle", _("vehicles")
+        QUOTATION = "quotation", _("quotations")
+        ISSUANCE = "issuance", _("issuances")
+
+    kind = models.CharField(_("kind"), max_length=32, choices=Kind.choices)
+    object_id = models.BigIntegerField(_("object id"))
+    title = models.CharField(_("title"), max_length=255)
+    subtitle = models.CharField(_("subtitle"), max_length=255, blank=True)
+    # registro al que lleva el resultado (p. ej. la membresía del cliente)
+    link_id = models.BigIntegerField(_("link id"), null=True)
+    document = models.TextField(_("search document"))
+
+    class Meta:
+        verbose_name = _("search entry")
+        verbose_name_plural = _("search entries")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "object_id"], name="rrgg_search_entry_key"
+            ),
+        ]
+        indexes = [
+            GinIndex(
+                OpClass(Upper("document"), name="gin_trgm_ops"),
+                name="rrgg_search_entry_trgm",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
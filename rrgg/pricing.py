@@ -0,0 +1,225 @@
+"""Cotización con todas las aseguradoras.
+
+``latest_ratios`` resuelve el último ``InsuranceVehicleRatio`` de cada
+aseguradora en una sola consulta y ``quote_all`` arma la matriz de
+comparación de una cotización (prima neta, derecho de emisión, IGV, total
+y cuotas por aseguradora) con una consulta más. El formulario de primas y
+los reportes PDF y XLSX leen de aquí, así que hacen un número fijo de
+consultas sin importar cuántas aseguradoras haya.
+
+Los ratios cambian muy de vez en cuando, así que ``current_ratios`` los
+guarda en memoria del proceso. Guardar o borrar un ratio o una aseguradora
+los descarta al confirmar la transacción e incrementa la generación
+``ratios`` de ``rrgg.cache``; el resto de procesos la revisa cada
+``GENERATION_CHECK_INTERVAL`` segundos y recarga si cambió. Mientras la
+transacción que los cambió siga abierta, el hilo que la lleva los lee de
+la base de datos sin cachearlos, para no quedarse con ratios que podrían
+revertirse.
+
+Los ratios no se modifican: cada cambio agrega una fila, así que
+``ratios_as_of`` puede decir qué ratio regía en una fecha. Resuelve todos
+los pares (aseguradora, fecha) con una consulta sobre el índice
+(insurance_vehicle, created).
+"""
+
+import bisect
+import datetime
+import threading
+import time
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from . import breakdown
+from .cache import bump_generation, get_generation
+
+GENERATION = "ratios"
+
+# segundos entre lecturas de la generación compartida; es lo que puede
+# tardar otro proceso en ver un ratio nuevo
+GENERATION_CHECK_INTERVAL = 5
+
+# generación con la que se cargaron los ratios, momento de la última
+# revisión (time.monotonic) y ratios
+_cached = (None, 0.0, None)
+
+# marca los hilos con ratios cambiados en una transacción sin confirmar
+_pending = threading.local()
+
+
+class Quote(NamedTuple):
+    insurance_vehicle: Any
+    # ratio con el que se calculan los montos: el de la prima registrada o,
+    # si no hay, el vigente
+    ratio: Any
+    premium: Optional[Any]
+    # montos de breakdown.PREMIUM_FIELDS; None si no hay prima
+    figures: Optional[Dict[str, Decimal]]
+
+
+def latest_ratios() -> List[Any]:
+    """Último ratio de cada aseguradora, ordenados por su nombre."""
+    ratio_model = global_apps.get_model("rrgg", "InsuranceVehicleRatio")
+    return list(
+        ratio_model.objects.select_related("insurance_vehicle")
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F("insurance_vehicle_id"),
+                order_by=[F("created").desc(), F("id").desc()],
+            )
+        )
+        .filter(position=1)
+        .order_by("insurance_vehicle__name")
+    )
+
+
+def current_ratios() -> List[Any]:
+    """``latest_ratios`` cacheado en el proceso.
+
+    Las instancias se comparten entre peticiones y no deben modificarse.
+    """
+    global _cached
+    if getattr(_pending, "invalidated", False):
+        if transaction.get_connection().in_atomic_block:
+            return latest_ratios()
+        # la transacción terminó sin confirmar: lo cacheado sigue vigente
+        _pending.invalidated = False
+    generation, checked, ratios = _cached
+    now = time.monotonic()
+    if ratios is not None and now - checked < GENERATION_CHECK_INTERVAL:
+        return ratios
+    current = get_generation(GENERATION)
+    if ratios is None or current != generation:
+        # la generación se lee antes de cargar: si cambia mientras tanto,
+        # la siguiente revisión vuelve a cargar
+        ratios = latest_ratios()
+    _cached = (current, now, ratios)
+    return ratios
+
+
+def current_ratio(insurance_vehicle_id: int) -> Optional[Any]:
+    for ratio in current_ratios():
+        if ratio.insurance_vehicle_id == insurance_vehicle_id:
+            return ratio
+    return None
+
+
+def _discard_ratios():
+    global _cached
+    _cached = (None, 0.0, None)
+
+
+def invalidate_ratios():
+    _pending.invalidated = True
+
+    def bump():
+        _pending.invalidated = False
+        _discard_ratios()
+        bump_generation(GENERATION)
+
+    transaction.on_commit(bump)
+
+
+def _upper_bound(moment) -> datetime.datetime:
+    # límite exclusivo: una fecha incluye los ratios creados ese día
+    if isinstance(moment, datetime.datetime):
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment + datetime.timedelta(microseconds=1)
+    return timezone.make_aware(
+        datetime.datetime.combine(
+            moment + datetime.timedelta(days=1), datetime.time.min
+        )
+    )
+
+
+def ratios_as_of(
+    pairs: Iterable[Tuple[int, Any]]
+) -> Dict[Tuple[int, Any], Optional[Any]]:
+    """Ratio que regía para cada par (id de aseguradora, fecha o datetime).
+
+    Devuelve None para los pares anteriores al primer ratio de la
+    aseguradora.
+    """
+    ratio_model = global_apps.get_model("rrgg", "InsuranceVehicleRatio")
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    bounds = {pair: _upper_bound(pair[1]) for pair in pairs}
+    history = defaultdict(list)
+    for ratio in ratio_model.objects.filter(
+        insurance_vehicle_id__in={insurer for insurer, _moment in pairs},
+        created__lt=max(bounds.values()),
+    ).order_by("insurance_vehicle_id", "created", "id"):
+        history[ratio.insurance_vehicle_id].append(ratio)
+    created = {
+        insurer: [ratio.created for ratio in ratios]
+        for insurer, ratios in history.items()
+    }
+    result = {}
+    for pair, bound in bounds.items():
+        insurer = pair[0]
+        position = bisect.bisect_left(created.get(insurer, []), bound)
+        result[pair] = history[insurer][position - 1] if position else None
+    return result
+
+
+def ratio_as_of(insurance_vehicle_id: int, moment) -> Optional[Any]:
+    return ratios_as_of([(insurance_vehicle_id, moment)])[
+        (insurance_vehicle_id, moment)
+    ]
+
+
+def quote_all(quotation) -> List[Quote]:
+    """Matriz de comparación de ``quotation`` con todas las aseguradoras.
+
+    Si la cotización tiene varias primas de una aseguradora se toma la
+    última registrada.
+    """
+    premiums = {}
+    for premium in quotation.premiums.select_related(
+        "insurance_vehicle_ratio"
+    ).order_by("id"):
+        premiums[premium.insurance_vehicle_ratio.insurance_vehicle_id] = (
+            premium
+        )
+    ratios = current_ratios()
+    priced = [
+        premiums[ratio.insurance_vehicle_id]
+        for ratio in ratios
+        if ratio.insurance_vehicle_id in premiums
+    ]
+    figures = dict(
+        zip(
+            [premium.id for premium in priced],
+            breakdown.premium_breakdown(priced),
+        )
+    )
+    quotes = []
+    for ratio in ratios:
+        premium = premiums.get(ratio.insurance_vehicle_id)
+        if premium is not None:
+            # evita una consulta por prima al leer la aseguradora
+            premium.insurance_vehicle_ratio.insurance_vehicle = (
+                ratio.insurance_vehicle
+            )
+        quotes.append(
+            Quote(
+                insurance_vehicle=ratio.insurance_vehicle,
+                ratio=(
+                    premium.insurance_vehicle_ratio
+                    if premium is not None
+                    else ratio
+                ),
+                premium=premium,
+                figures=figures.get(premium.id) if premium else None,
+            )
+        )
+    return quotes
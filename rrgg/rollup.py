@@ -0,0 +1,193 @@
+"""Resumen mensual (``MonthlyRollup``) que alimenta el dashboard."""
+
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from .cache import bump_generation
+
+Key = Tuple[int, int, str, str, str]
+
+# generación de datos de los resultados que se leen del resumen
+GENERATION = "rollup"
+
+_state = threading.local()
+
+
+def _seller_name(given_name, first_surname):
+    if given_name is None:
+        return ""
+    return f"{given_name} {first_surname}"
+
+
+def period_range(year, month):
+    start = timezone.make_aware(datetime(year, month, 1))
+    if month == 12:
+        end = timezone.make_aware(datetime(year + 1, 1, 1))
+    else:
+        end = timezone.make_aware(datetime(year, month + 1, 1))
+    return start, end
+
+
+class RollupBuilder:
+    """Agrega la data histórica, las primas cotizadas y las emisiones."""
+
+    def __init__(self, apps=global_apps):
+        self.rollup_model = apps.get_model("rrgg", "MonthlyRollup")
+        self.record_model = apps.get_model("rrgg", "HistoricalRecord")
+        self.premium_model = apps.get_model(
+            "rrgg", "QuotationInsuranceVehiclePremium"
+        )
+        self.issuance_model = apps.get_model(
+            "rrgg", "IssuanceInsuranceVehicle"
+        )
+
+    def _new_row(self, key: Key):
+        year, month, currency, insurer, consultant = key
+        return self.rollup_model(
+            year=year,
+            month=month,
+            currency=currency,
+            insurer=insurer,
+            consultant=consultant,
+        )
+
+    def _historical(self, rows, period):
+        queryset = self.record_model.objects.all()
+        if period:
+            queryset = queryset.filter(year=period[0], month=period[1])
+        aggregates = queryset.values(
+            "year",
+            "month",
+            currency_name=F("currency__name"),
+            insurer_name=F("insurer__name"),
+            consultant_name=F("consultant__name"),
+        ).annotate(
+            net_premium_sum=Sum("net_premium"),
+            net_commission_sum=Sum("net_commission"),
+        )
+        for item in aggregates.order_by():
+            key = (
+                item["year"],
+                item["month"],
+                item["currency_name"] or "",
+                item["insurer_name"] or "",
+                item["consultant_name"] or "",
+            )
+            row = rows.setdefault(key, self._new_row(key))
+            for field in ("net_premium", "net_commission"):
+                amount = item[f"{field}_sum"]
+                if amount is not None:
+                    current = getattr(row, field) or Decimal(0)
+                    setattr(row, field, current + amount)
+
+    def _quotations(self, period):
+        queryset = self.premium_model.objects.all()
+        if period:
+            queryset = queryset.filter(created__range=period_range(*period))
+        quotation = "quotation_insurance_vehicle__"
+        return queryset.values(
+            period_year=ExtractYear("created"),
+            period_month=ExtractMonth("created"),
+            currency_name=F(f"{quotation}currency__name"),
+            insurer_name=F("insurance_vehicle_ratio__insurance_vehicle__name"),
+            seller_given_name=F(f"{quotation}consultant_seller__given_name"),
+            seller_first_surname=F(
+                f"{quotation}consultant_seller__first_surname"
+            ),
+        ).annotate(total=Count("id"))
+
+    def _issuances(self, period):
+        queryset = self.issuance_model.objects.all()
+        if period:
+            queryset = queryset.filter(created__range=period_range(*period))
+        premium = "quotation_vehicle_premiums__"
+        return queryset.values(
+            period_year=ExtractYear("created"),
+            period_month=ExtractMonth("created"),
+            currency_name=F(
+                f"{premium}quotation_insurance_vehicle__currency__name"
+            ),
+            insurer_name=F(
+                f"{premium}insurance_vehicle_ratio__insurance_vehicle__name"
+            ),
+            seller_given_name=F("consultant_seller__given_name"),
+            seller_first_surname=F("consultant_seller__first_surname"),
+        ).annotate(total=Count("id", distinct=True))
+
+    def _counts(self, rows, aggregates, field):
+        for item in aggregates.order_by():
+            key = (
+                item["period_year"],
+                item["period_month"],
+                item["currency_name"] or "",
+                item["insurer_name"] or "",
+                _seller_name(
+                    item["seller_given_name"], item["seller_first_surname"]
+                ),
+            )
+            row = rows.setdefault(key, self._new_row(key))
+            setattr(row, field, getattr(row, field) + item["total"])
+
+    def aggregate(self, period: Optional[Tuple[int, int]] = None):
+        """Filas del resumen, de todo el histórico o de un solo periodo."""
+        rows: Dict[Key, object] = {}
+        self._historical(rows, period)
+        self._counts(rows, self._quotations(period), "quotation_count")
+        self._counts(rows, self._issuances(period), "issuance_count")
+        return list(rows.values())
+
+    @transaction.atomic
+    def refresh_period(self, year, month):
+        self.rollup_model.objects.filter(year=year, month=month).delete()
+        self.rollup_model.objects.bulk_create(self.aggregate((year, month)))
+
+    @transaction.atomic
+    def rebuild(self):
+        self.rollup_model.objects.all().delete()
+        rows = self.aggregate()
+        self.rollup_model.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+
+def refresh_period(year, month):
+    RollupBuilder().refresh_period(year, month)
+    bump_generation(GENERATION)
+
+
+def rebuild():
+    rows = RollupBuilder().rebuild()
+    bump_generation(GENERATION)
+    return rows
+
+
+@contextmanager
+def paused():
+    """Desactiva el refresco por señales; quien lo use debe reconstruir."""
+    _state.paused = getattr(_state, "paused", 0) + 1
+    try:
+        yield
+    finally:
+        _state.paused -= 1
+
+
+def schedule_refresh(year, month):
+    """Refresca el periodo cuando la transacción actual se confirma."""
+    if year is None or month is None or getattr(_state, "paused", 0):
+        return
+    transaction.on_commit(lambda: refresh_period(year, month))
+
+
+def schedule_refresh_at(created):
+    if created is None:
+        return
+    created = timezone.localtime(created)
+    schedule_refresh(created.year, created.month)
@@ -0,0 +1,135 @@
+"""Documento de búsqueda de las emisiones vehiculares.
+
+Cada emisión guarda en ``search_document`` el texto en que se busca
+(póliza, contratante, placas, asesor, aseguradora, ...) en mayúsculas. La
+columna tiene un índice trigram, así que ``icontains`` se resuelve con el
+índice y sin recorrer las primas.
+"""
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Prefetch
+
+PREMIUM_RELATED = (
+    "insurance_vehicle_ratio__insurance_vehicle",
+    "quotation_insurance_vehicle__customer__natural_person",
+    "quotation_insurance_vehicle__customer__legal_person",
+    "quotation_insurance_vehicle__vehicle",
+)
+
+ISSUANCE_RELATED = (
+    "consultant_seller",
+    "status",
+    "issuance_type",
+    "payment_method",
+)
+
+
+def person_terms(customer):
+    if customer.natural_person:
+        person = customer.natural_person
+        return [
+            person.given_name,
+            person.first_surname,
+            person.second_surname,
+            person.document_number,
+        ]
+    if customer.legal_person:
+        person = customer.legal_person
+        return [
+            person.registered_name,
+            person.general_manager,
+            person.document_number,
+        ]
+    return []
+
+
+def join_words(terms) -> str:
+    """Une las palabras de ``terms`` en mayúsculas y sin repetirlas."""
+    words = []
+    for term in terms:
+        for word in str(term or "").upper().split():
+            if word not in words:
+                words.append(word)
+    return " ".join(words)
+
+
+def build_document(issuance, premiums) -> str:
+    terms = [
+        issuance.policy,
+        issuance.collection_document,
+        issuance.issuance_date,
+        issuance.initial_validity,
+        issuance.final_validity,
+        issuance.issuance_type.name,
+        issuance.payment_method.name,
+        issuance.consultant_seller.given_name,
+        issuance.consultant_seller.first_surname,
+        issuance.status.name if issuance.status_id else None,
+    ]
+    for premium in premiums:
+        quotation = premium.quotation_insurance_vehicle
+        terms += person_terms(quotation.customer)
+        terms += [
+            quotation.vehicle.plate,
+            premium.insurance_vehicle_ratio.insurance_vehicle.name,
+        ]
+    return join_words(terms)
+
+
+def premiums_of(issuance):
+    return issuance.quotation_vehicle_premiums.select_related(
+        *PREMIUM_RELATED
+    ).order_by("id")
+
+
+def apply_document(issuance):
+    """Asigna ``search_document`` a ``issuance`` sin guardarla."""
+    premiums = premiums_of(issuance) if issuance.pk else []
+    issuance.search_document = build_document(issuance, premiums)
+
+
+def refresh_documents(issuance_ids):
+    """Reconstruye y guarda el documento de las emisiones indicadas."""
+    model = global_apps.get_model("rrgg", "IssuanceInsuranceVehicle")
+    with transaction.atomic():
+        issuances = model.objects.filter(id__in=issuance_ids).select_related(
+            *ISSUANCE_RELATED
+        )
+        for issuance in issuances:
+            model.objects.filter(id=issuance.id).update(
+                search_document=build_document(issuance, premiums_of(issuance))
+            )
+
+
+def backfill(batch_size=500):
+    """Reconstruye el documento de todas las emisiones."""
+    model = global_apps.get_model("rrgg", "IssuanceInsuranceVehicle")
+    premium_model = global_apps.get_model(
+        "rrgg", "QuotationInsuranceVehiclePremium"
+    )
+    queryset = (
+        model.objects.select_related(*ISSUANCE_RELATED)
+        .prefetch_related(
+            Prefetch(
+                "quotation_vehicle_premiums",
+                premium_model.objects.select_related(
+                    *PREMIUM_RELATED
+                ).order_by("id"),
+            )
+        )
+        .order_by("id")
+    )
+    batch = []
+    updated = 0
+    for issuance in queryset.iterator(chunk_size=batch_size):
+        issuance.search_document = build_document(
+            issuance, issuance.quotation_vehicle_premiums.all()
+        )
+        batch.append(issuance)
+        if len(batch) >= batch_size:
+            model.objects.bulk_update(batch, ["search_document"])
+            updated += len(batch)
+            batch = []
+    model.objects.bulk_update(batch, ["search_document"])
+    return updated + len(batch)
@@ -0,0 +1,274 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import (
+    commissions,
+    global_search,
+    models,
+    pricing,
+    rollup,
+    search,
+    totals,
+)
+from .historical import HistoricalLoader
+
+
+@receiver(post_save, sender=models.HistoricalData)
+def sync_historical_record(sender, instance, raw=False, **kwargs):
+    # loaddata usa raw=True: los registros se cargan luego con
+    # backfill_historical
+    if raw:
+        return
+    HistoricalLoader().load(instance)
+
+
+# MONTHLY ROLLUP
+
+
+@receiver(pre_save, sender=models.HistoricalRecord)
+def remember_historical_period(sender, instance, raw=False, **kwargs):
+    instance._previous_period = (
+        sender.objects.filter(id=instance.id)
+        .values_list("year", "month")
+        .first()
+        if instance.id and not raw
+        else None
+    )
+
+
+@receiver(post_save, sender=models.HistoricalRecord)
+@receiver(post_delete, sender=models.HistoricalRecord)
+def refresh_historical_period(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rollup.schedule_refresh(instance.year, instance.month)
+    previous = getattr(instance, "_previous_period", None)
+    if previous and previous != (instance.year, instance.month):
+        rollup.schedule_refresh(*previous)
+
+
+@receiver(post_save, sender=models.QuotationInsuranceVehiclePremium)
+@receiver(post_delete, sender=models.QuotationInsuranceVehiclePremium)
+@receiver(post_save, sender=models.IssuanceInsuranceVehicle)
+@receiver(post_delete, sender=models.IssuanceInsuranceVehicle)
+def refresh_created_period(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rollup.schedule_refresh_at(instance.created)
+
+
+@receiver(post_save, sender=models.QuotationInsuranceVehicle)
+def refresh_quotation_periods(sender, instance, created, raw=False, **kwargs):
+    # la moneda y el asesor de la cotización forman parte de la clave
+    if created or raw:
+        return
+    for premium_created in instance.premiums.values_list("created", flat=True):
+        rollup.schedule_refresh_at(premium_created)
+
+
+@receiver(
+    m2m_changed,
+    sender=models.IssuanceInsuranceVehicle.quotation_vehicle_premiums.through,
+)
+def refresh_issuance_premiums_period(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        rollup.schedule_refresh_at(instance.created)
+    elif pk_set:
+        issuances = models.IssuanceInsuranceVehicle.objects.filter(
+            id__in=pk_set
+        )
+        for issuance_created in issuances.values_list("created", flat=True):
+            rollup.schedule_refresh_at(issuance_created)
+
+
+# MONTOS Y DOCUMENTO DE BÚSQUEDA DE EMISIONES
+
+
+def refresh_issuances(issuance_ids):
+    totals.refresh_totals(issuance_ids)
+    search.refresh_documents(issuance_ids)
+    global_search.refresh("issuance", issuance_ids)
+    commissions.invalidate()
+
+
+@receiver(pre_save, sender=models.IssuanceInsuranceVehicle)
+def apply_issuance_totals(sender, instance, raw=False, **kwargs):
+    # los porcentajes de comisión de la emisión también intervienen
+    if raw:
+        return
+    totals.apply_totals(instance)
+    search.apply_document(instance)
+
+
+@receiver(
+    m2m_changed,
+    sender=models.IssuanceInsuranceVehicle.quotation_vehicle_premiums.through,
+)
+def refresh_issuance_totals(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            refresh_issuances([instance.id])
+    elif action == "pre_clear":
+        instance._cleared_issuance_ids = list(
+            instance.issuances.values_list("id", flat=True)
+        )
+    elif action == "post_clear":
+        refresh_issuances(instance._cleared_issuance_ids)
+    elif action in ("post_add", "post_remove"):
+        refresh_issuances(pk_set)
+
+
+@receiver(pre_delete, sender=models.QuotationInsuranceVehiclePremium)
+def remember_premium_issuances(sender, instance, **kwargs):
+    instance._issuance_ids = list(
+        instance.issuances.values_list("id", flat=True)
+    )
+
+
+@receiver(post_save, sender=models.QuotationInsuranceVehiclePremium)
+@receiver(post_delete, sender=models.QuotationInsuranceVehiclePremium)
+def refresh_premium_issuance_totals(sender, instance, raw=False, **kwargs):
+    if raw or kwargs.get("created"):
+        return
+    issuance_ids = getattr(instance, "_issuance_ids", None)
+    if issuance_ids is None:
+        issuance_ids = instance.issuances.values_list("id", flat=True)
+    refresh_issuances(list(issuance_ids))
+
+
+@receiver(post_save, sender=models.QuotationInsuranceVehicle)
+def refresh_quotation_issuance_totals(
+    sender, instance, created, raw=False, **kwargs
+):
+    # la suma asegurada, el contratante y el vehículo salen de la cotización
+    if created or raw:
+        return
+    issuances = models.IssuanceInsuranceVehicle.objects.filter(
+        quotation_vehicle_premiums__quotation_insurance_vehicle=instance
+    )
+    refresh_issuances(list(issuances.values_list("id", flat=True)))
+
+
+# emisiones cuyo documento de búsqueda incluye datos del modelo
+SEARCH_LOOKUPS = {
+    models.NaturalPerson: (
+        "quotation_vehicle_premiums__quotation_insurance_vehicle__customer__"
+        "natural_person"
+    ),
+    models.LegalPerson: (
+        "quotation_vehicle_premiums__quotation_insurance_vehicle__customer__"
+        "legal_person"
+    ),
+    models.Vehicle: (
+        "quotation_vehicle_premiums__quotation_insurance_vehicle__vehicle"
+    ),
+    models.Consultant: "consultant_seller",
+}
+
+
+def refresh_search_documents(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    issuances = models.IssuanceInsuranceVehicle.objects.filter(
+        **{SEARCH_LOOKUPS[sender]: instance}
+    )
+    issuance_ids = list(issuances.values_list("id", flat=True))
+    search.refresh_documents(issuance_ids)
+    global_search.refresh("issuance", issuance_ids)
+
+
+for search_sender in SEARCH_LOOKUPS:
+    post_save.connect(refresh_search_documents, sender=search_sender)
+
+
+# ÍNDICE DE BÚSQUEDA GLOBAL
+
+SEARCH_INDEX_KINDS = {
+    models.NaturalPerson: "natural_person",
+    models.LegalPerson: "legal_person",
+    models.Vehicle: "vehicle",
+    models.QuotationInsuranceVehicle: "quotation",
+    models.IssuanceInsuranceVehicle: "issuance",
+}
+
+# cotizaciones cuya entrada incluye datos del modelo
+QUOTATION_SEARCH_LOOKUPS = {
+    models.NaturalPerson: "customer__natural_person",
+    models.LegalPerson: "customer__legal_person",
+    models.Vehicle: "vehicle",
+    models.Consultant: "consultant_seller",
+}
+
+
+def refresh_search_entry(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    global_search.refresh(SEARCH_INDEX_KINDS[sender], [instance.id])
+
+
+def refresh_quotation_search_entries(
+    sender, instance, created=False, raw=False, **kwargs
+):
+    if created or raw:
+        return
+    quotations = models.QuotationInsuranceVehicle.objects.filter(
+        **{QUOTATION_SEARCH_LOOKUPS[sender]: instance}
+    )
+    global_search.refresh("quotation", quotations.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=models.CustomerMembership)
+@receiver(post_delete, sender=models.CustomerMembership)
+def refresh_customer_search_entry(sender, instance, raw=False, **kwargs):
+    # la entrada de la persona enlaza al detalle de su membresía
+    if raw:
+        return
+    if instance.natural_person_id:
+        global_search.refresh("natural_person", [instance.natural_person_id])
+    if instance.legal_person_id:
+        global_search.refresh("legal_person", [instance.legal_person_id])
+
+
+for search_sender in SEARCH_INDEX_KINDS:
+    post_save.connect(refresh_search_entry, sender=search_sender)
+    post_delete.connect(refresh_search_entry, sender=search_sender)
+
+for search_sender in QUOTATION_SEARCH_LOOKUPS:
+    post_save.connect(refresh_quotation_search_entries, sender=search_sender)
+
+
+# LIQUIDACIÓN DE COMISIONES
+
+
+@receiver(post_save, sender=models.IssuanceInsuranceVehicle)
+@receiver(post_delete, sender=models.IssuanceInsuranceVehicle)
+@receiver(post_save, sender=models.EndorsementVehicle)
+@receiver(post_delete, sender=models.EndorsementVehicle)
+def invalidate_commission_statements(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    commissions.invalidate()
+
+
+# RATIOS VIGENTES DE LAS ASEGURADORAS
+
+
+@receiver(post_save, sender=models.InsuranceVehicleRatio)
+@receiver(post_delete, sender=models.InsuranceVehicleRatio)
+@receiver(post_save, sender=models.InsuranceVehicle)
+@receiver(post_delete, sender=models.InsuranceVehicle)
+def invalidate_ratios(sender, instance, **kwargs):
+    # también con raw=True: descartar la caché no consulta la base de datos
+    pricing.invalidate_ratios()
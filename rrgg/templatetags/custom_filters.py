@@ -1,7 +1,9 @@
-from decimal import ROUND_HALF_UP, Decimal
+from decimal import Decimal
 
 from django import template
 
+from rrggweb.utils import round_half_up
+
 register = template.Library()
 
 
@@ -14,12 +16,17 @@ def to_two_decimals(value):
 @register.filter(name="to_percentage")
 def to_percentage(value):
     if value is not None:
-        value = Decimal(value * 100).quantize(
-            Decimal("0.00"), rounding=ROUND_HALF_UP
-        )
+        value = round_half_up(Decimal(value * 100))
         if value % 1 == 0:
             return "{:.0f}%".format(value)
         else:
             return "{:.2f}%".format(value).replace(".", ",")
     else:
         return ""
+
+
+@register.filter(name="approximate")
+def approximate(value):
+    if getattr(value, "estimated", False):
+        return f"~{value}"
+    return value
@@ -0,0 +1,187 @@
+"""Montos de una emisión vehicular guardados como columnas."""
+
+from decimal import Decimal
+from typing import Dict
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+from rrggweb.utils import to_decimal
+
+TOTAL_FIELDS = (
+    "insured_amount",
+    "net_premium",
+    "emission_right",
+    "commercial_premium",
+    "tax",
+    "total_premium",
+    "net_commission",
+    "seller_commission",
+    "kcs_commission",
+)
+
+
+def compute_totals(issuance, premiums) -> Dict[str, Decimal]:
+    """Calcula los montos de ``issuance`` a partir de sus primas.
+
+    ``premiums`` debe venir ordenado por id: los porcentajes de derecho de
+    emisión e IGV se toman de la primera prima, como hacía
+    ``quotation_vehicle_premiums.first()``.
+    """
+    premiums = list(premiums)
+    amount = sum(premium.amount for premium in premiums)
+    net_premium = to_decimal(amount)
+    if premiums:
+        first = premiums[0]
+        emission_right = to_decimal(
+            net_premium * first.emission_right_percentage
+        )
+        tax_percentage = first.tax_percentage
+    else:
+        emission_right = tax_percentage = Decimal(0)
+    commercial_premium = to_decimal(net_premium + emission_right)
+    tax = to_decimal(commercial_premium * tax_percentage)
+    net_commission = to_decimal(amount * issuance.plan_commission_percentage)
+    seller_commission = to_decimal(
+        issuance.seller_commission_percentage * net_commission
+    )
+    return {
+        "insured_amount": to_decimal(
+            sum(
+                premium.quotation_insurance_vehicle.insured_amount
+                for premium in premiums
+            )
+        ),
+        "net_premium": net_premium,
+        "emission_right": emission_right,
+        "commercial_premium": commercial_premium,
+        "tax": tax,
+        "total_premium": commercial_premium + tax,
+        "net_commission": net_commission,
+        "seller_commission": seller_commission,
+        "kcs_commission": to_decimal(net_commission - seller_commission),
+    }
+
+
+def money_expression(expression):
+    # ROUND de PostgreSQL sobre numeric redondea la mitad hacia arriba
+    # (lejos de cero), igual que ROUND_HALF_UP en to_decimal
+    return Round(
+        expression,
+        precision=2,
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def total_expressions(premium_model):
+    """Expresiones de ``compute_totals`` para anotar emisiones en SQL.
+
+    Cada monto se anota como ``computed_<campo>`` porque el nombre del
+    campo ya lo usa la columna guardada.
+    """
+    premiums = premium_model.objects.filter(issuances=OuterRef("pk"))
+
+    def coalesce(subquery):
+        return Coalesce(
+            subquery,
+            Value(Decimal(0)),
+            output_field=DecimalField(max_digits=14, decimal_places=4),
+        )
+
+    def premium_sum(field):
+        return coalesce(
+            Subquery(
+                premiums.order_by()
+                .values("issuances")
+                .annotate(total=Sum(field))
+                .values("total")
+            )
+        )
+
+    def first_premium(field):
+        return coalesce(Subquery(premiums.order_by("id").values(field)[:1]))
+
+    amount = premium_sum("amount")
+    net_premium = money_expression(amount)
+    emission_right = money_expression(
+        net_premium * first_premium("emission_right_percentage")
+    )
+    commercial_premium = money_expression(net_premium + emission_right)
+    tax = money_expression(
+        commercial_premium * first_premium("tax_percentage")
+    )
+    net_commission = money_expression(amount * F("plan_commission_percentage"))
+    seller_commission = money_expression(
+        F("seller_commission_percentage") * net_commission
+    )
+    return {
+        "computed_insured_amount": money_expression(
+            premium_sum("quotation_insurance_vehicle__insured_amount")
+        ),
+        "computed_net_premium": net_premium,
+        "computed_emission_right": emission_right,
+        "computed_commercial_premium": commercial_premium,
+        "computed_tax": tax,
+        "computed_total_premium": money_expression(commercial_premium + tax),
+        "computed_net_commission": net_commission,
+        "computed_seller_commission": seller_commission,
+        "computed_kcs_commission": money_expression(
+            net_commission - seller_commission
+        ),
+    }
+
+
+def premiums_of(issuance):
+    return issuance.quotation_vehicle_premiums.select_related(
+        "quotation_insurance_vehicle"
+    ).order_by("id")
+
+
+def apply_totals(issuance, premiums=None):
+    """Asigna los montos a ``issuance`` sin guardarla."""
+    if premiums is None:
+        premiums = premiums_of(issuance) if issuance.pk else []
+    for field, value in compute_totals(issuance, premiums).items():
+        setattr(issuance, field, value)
+
+
+def refresh_totals(issuance_ids):
+    """Recalcula y guarda los montos de las emisiones indicadas.
+
+    Se usa ``update()`` para no disparar las señales de ``post_save``.
+    """
+    model = global_apps.get_model("rrgg", "IssuanceInsuranceVehicle")
+    with transaction.atomic():
+        issuances = (
+            model.objects.filter(id__in=issuance_ids)
+            .select_for_update()
+            .order_by("id")
+        )
+        for issuance in issuances:
+            totals = compute_totals(issuance, premiums_of(issuance))
+            model.objects.filter(id=issuance.id).update(**totals)
+
+
+def backfill(batch_size=500):
+    """Recalcula los montos de todas las emisiones."""
+    model = global_apps.get_model("rrgg", "IssuanceInsuranceVehicle")
+    queryset = model.objects.prefetch_related(
+        "quotation_vehicle_premiums__quotation_insurance_vehicle"
+    ).order_by("id")
+    batch = []
+    updated = 0
+    for issuance in queryset.iterator(chunk_size=batch_size):
+        premiums = sorted(
+            issuance.quotation_vehicle_premiums.all(),
+            key=lambda premium: premium.id,
+        )
+        apply_totals(issuance, premiums)
+        batch.append(issuance)
+        if len(batch) >= batch_size:
+            model.objects.bulk_update(batch, TOTAL_FIELDS)
+            updated += len(batch)
+            batch = []
+    model.objects.bulk_update(batch, TOTAL_FIELDS)
+    return updated + len(batch)
@@ -0,0 +1,113 @@
+"""Conteos aproximados para listados grandes.
+
+Debajo de ``RRGG_EXACT_COUNT_THRESHOLD`` filas se cuenta con ``COUNT(*)``.
+Por encima se usa la estimación del planificador de PostgreSQL o, para
+listados sin filtros, un conteo exacto cacheado durante
+``RRGG_COUNT_CACHE_TIMEOUT`` segundos. Los conteos que no son exactos se
+muestran como "~N" con el filtro ``approximate``.
+"""
+
+import json
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+
+class ApproximateCount(int):
+    """Entero que recuerda si es una estimación."""
+
+    def __new__(cls, value, estimated=False):
+        count = super().__new__(cls, value)
+        count.estimated = estimated
+        return count
+
+
+def planner_estimate(queryset) -> Optional[int]:
+    """Filas estimadas por ``EXPLAIN``; ``None`` fuera de PostgreSQL."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _cached_total(queryset):
+    model = queryset.model._meta
+    key = f"rrgg:count:{queryset.db}:{model.label_lower}"
+    total = cache.get(key)
+    if total is None:
+        total = queryset.order_by().count()
+        cache.set(key, total, timeout=settings.RRGG_COUNT_CACHE_TIMEOUT)
+    return total
+
+
+def approximate_count(queryset, threshold=None) -> ApproximateCount:
+    if threshold is None:
+        threshold = settings.RRGG_EXACT_COUNT_THRESHOLD
+    estimate = planner_estimate(queryset)
+    if estimate is None or estimate < threshold:
+        return ApproximateCount(queryset.count())
+    if not queryset.query.where:
+        return ApproximateCount(_cached_total(queryset), estimated=True)
+    return ApproximateCount(estimate, estimated=True)
+
+
+class ApproximatePage(Page):
+    """Página que sabe si hay otra sin depender del conteo estimado."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class ApproximateCountPaginator(Paginator):
+    """``Paginator`` que no cuenta exactamente los listados grandes.
+
+    Con un conteo estimado no se valida el límite superior de la página:
+    una página más allá del final simplemente llega vacía.
+    """
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, "query"):
+            return approximate_count(self.object_list)
+        return ApproximateCount(len(self.object_list))
+
+    def validate_number(self, number):
+        if not getattr(self.count, "estimated", False):
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        return number
+
+    def page(self, number):
+        if not getattr(self.count, "estimated", False):
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        # se lee una fila de más para saber si existe la página siguiente
+        top = bottom + self.per_page + 1
+        object_list = list(self.object_list[bottom:top])
+        return ApproximatePage(
+            object_list[: self.per_page],
+            number,
+            self,
+            has_next=len(object_list) > self.per_page,
+        )
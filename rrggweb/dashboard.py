@@ -0,0 +1,116 @@
+"""Series del dashboard calculadas en una sola pasada sobre el resumen."""
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from django.db.models import Q, Sum
+
+import rrgg.models
+
+SOLES = "SOLES"
+DOLLARS = "DOLARES"
+
+Key = Tuple[int, int, str]
+
+
+class Series(NamedTuple):
+    labels: List[str]
+    values: List[float]
+
+
+class Dashboard(NamedTuple):
+    net_premium_soles: Series
+    net_premium_dollars: Series
+    net_commission_soles: Series
+    net_commission_dollars: Series
+    total_quotations: Series
+    total_issuances: Series
+
+
+# agregado -> (columna de MonthlyRollup, moneda, etiqueta del gráfico)
+AMOUNTS = {
+    "net_premium_soles": ("net_premium", SOLES, "insurer"),
+    "net_premium_dollars": ("net_premium", DOLLARS, "insurer"),
+    "net_commission_soles": ("net_commission", SOLES, "consultant"),
+    "net_commission_dollars": ("net_commission", DOLLARS, "consultant"),
+}
+
+COUNTS = {
+    "total_quotations": "quotation_count",
+    "total_issuances": "issuance_count",
+}
+
+
+def _amount_series(totals: Dict[Key, Decimal]) -> Series:
+    keys = sorted(totals)
+    return Series(
+        [label for _year, _month, label in keys],
+        [round(float(totals[key]), 2) for key in keys],
+    )
+
+
+def _count_series(totals: Dict[Key, Decimal], scale=1) -> Series:
+    keys = sorted(totals, key=lambda key: (key[2], key[0], key[1]))
+    return Series(
+        [label for _year, _month, label in keys],
+        [int(totals[key]) * scale for key in keys],
+    )
+
+
+def load_dashboard(
+    year: Optional[int] = None, month: Optional[int] = None
+) -> Dashboard:
+    """Lee todas las series del dashboard con una única consulta.
+
+    Los montos por moneda se obtienen con agregados filtrados
+    (``SUM(...) FILTER (WHERE currency = ...)``) y luego se reagrupan por
+    aseguradora o asesor en Python.
+
+    Como en el dashboard original, los montos se filtran por el año y el
+    mes que se indiquen, cada uno por separado, mientras que las
+    cotizaciones y emisiones solo se filtran si se indican ambos.
+    """
+    queryset = rrgg.models.MonthlyRollup.objects.all()
+    period = Q()
+    if year is not None:
+        period &= Q(year=year)
+    if month is not None:
+        period &= Q(month=month)
+    if year is not None and month is not None:
+        queryset = queryset.filter(period)
+
+    aggregates = {
+        name: Sum(column, filter=Q(currency=currency) & period)
+        for name, (column, currency, _label) in AMOUNTS.items()
+    }
+    aggregates.update({name: Sum(column) for name, column in COUNTS.items()})
+    rows = (
+        queryset.values("year", "month", "insurer", "consultant")
+        .annotate(**aggregates)
+        .order_by()
+    )
+
+    totals: Dict[str, Dict[Key, Decimal]] = {
+        name: defaultdict(Decimal) for name in [*AMOUNTS, *COUNTS]
+    }
+    for row in rows:
+        for name, (_column, _currency, label) in AMOUNTS.items():
+            if row[name] is not None:
+                key = (row["year"], row["month"], row[label])
+                totals[name][key] += row[name]
+        for name in COUNTS:
+            if row[name]:
+                key = (row["year"], row["month"], row["insurer"])
+                totals[name][key] += row[name]
+
+    return Dashboard(
+        net_premium_soles=_amount_series(totals["net_premium_soles"]),
+        net_premium_dollars=_amount_series(totals["net_premium_dollars"]),
+        net_commission_soles=_amount_series(totals["net_commission_soles"]),
+        net_commission_dollars=_amount_series(
+            totals["net_commission_dollars"]
+        ),
+        total_quotations=_count_series(totals["total_quotations"]),
+        total_issuances=_count_series(totals["total_issuances"], scale=2),
+    )
@@ -0,0 +1,100 @@
+"""Descarga de listados como CSV o XLSX sin cargarlos en memoria."""
+
+import abc
+import csv
+import itertools
+import os
+import pickle
+import tempfile
+from functools import lru_cache
+
+from django.http import FileResponse, StreamingHttpResponse
+
+XLSX_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+)
+
+# plantilla del reporte XLSX de cotización y columna de cada aseguradora
+# (por id) en la que se escriben sus montos
+QUOTATION_REPORT_TEMPLATE = os.path.join(
+    os.path.dirname(__file__), "resources", "report_quotations.xlsx"
+)
+QUOTATION_REPORT_COLUMNS = {1: "E", 2: "G", 3: "I", 4: "K", 5: "M"}
+
+
+class EchoBuffer:
+    def write(self, value):
+        return value
+
+
+class SpreadsheetExportMixin(abc.ABC):
+    """Responde ``get_rows()`` como CSV o, con ``?format=xlsx``, XLSX.
+
+    El CSV se envía por partes con ``StreamingHttpResponse``; el XLSX se
+    escribe con un libro de openpyxl en modo ``write_only`` sobre un archivo
+    temporal. En ambos casos las filas se leen de a poco con ``iterator()``.
+    """
+
+    chunk_size = 2000
+    filename = "export"
+    sheet_title = "Hoja1"
+
+    @abc.abstractmethod
+    def get_header(self):
+        """Títulos de las columnas."""
+
+    @abc.abstractmethod
+    def get_rows(self):
+        """Iterable de filas con los valores de cada columna."""
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get("format") == "xlsx":
+            return self.xlsx_response()
+        return self.csv_response()
+
+    def csv_response(self):
+        writer = csv.writer(EchoBuffer())
+        lines = itertools.chain([self.get_header()], self.get_rows())
+        response = StreamingHttpResponse(
+            (writer.writerow(line) for line in lines),
+            content_type="text/csv; charset=utf-8",
+        )
+        response["Content-Disposition"] = (
+            f"attachment; filename={self.filename}.csv"
+        )
+        return response
+
+    def xlsx_response(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(self.sheet_title)
+        sheet.append(self.get_header())
+        for row in self.get_rows():
+            sheet.append(row)
+        file = tempfile.TemporaryFile()
+        workbook.save(file)
+        file.seek(0)
+        return FileResponse(
+            file,
+            as_attachment=True,
+            filename=f"{self.filename}.xlsx",
+            content_type=XLSX_CONTENT_TYPE,
+        )
+
+
+@lru_cache(maxsize=None)
+def _template_data(path):
+    from openpyxl import load_workbook
+
+    return pickle.dumps(load_workbook(path), pickle.HIGHEST_PROTOCOL)
+
+
+def load_template(path):
+    """Libro nuevo con el contenido de la plantilla XLSX ``path``.
+
+    La plantilla se lee con openpyxl una sola vez por proceso y se guarda
+    serializada; cada llamada devuelve una copia independiente que se puede
+    modificar y guardar, mucho más barata que volver a leer el archivo.
+    """
+    return pickle.loads(_template_data(path))
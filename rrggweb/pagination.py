@@ -0,0 +1,167 @@
+"""Paginación por cursor (keyset) para listados ordenados por id.
+
+En lugar de ``OFFSET`` y ``COUNT(*)`` cada página se lee con
+``WHERE id < cursor ORDER BY id DESC LIMIT n + 1``, así que la página 500
+cuesta lo mismo que la primera. El cursor viaja en el mismo parámetro
+``page`` como un token opaco.
+"""
+
+import base64
+from typing import List, Optional, Tuple
+
+from django.db.models import QuerySet
+
+from .counts import ApproximateCountPaginator
+
+NEXT = "n"
+PREVIOUS = "p"
+LAST = "l"
+
+
+def encode_cursor(kind: str, value: Optional[int] = None) -> str:
+    raw = f"{kind}:{'' if value is None else value}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[Optional[str], Optional[int]]:
+    """Devuelve ``(tipo, id)``; un token inválido equivale a la 1ra página."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        kind, _, value = raw.decode().partition(":")
+    except ValueError:
+        return None, None
+    if kind == LAST:
+        return LAST, None
+    if kind in (NEXT, PREVIOUS) and value.isdigit():
+        return kind, int(value)
+    return None, None
+
+
+class CursorPage:
+    """Página con la misma interfaz que usan las plantillas de ``Page``."""
+
+    is_cursor = True
+
+    def __init__(
+        self,
+        object_list: List,
+        has_next: bool,
+        has_previous: bool,
+        request,
+        page_kwarg: str,
+    ):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.request = request
+        self.page_kwarg = page_kwarg
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def _url(self, token=None):
+        params = self.request.GET.copy()
+        params.pop(self.page_kwarg, None)
+        if token is not None:
+            params[self.page_kwarg] = token
+        return f"?{params.urlencode()}"
+
+    @property
+    def first_url(self):
+        return self._url()
+
+    @property
+    def previous_url(self):
+        if not self.object_list:
+            return self.first_url
+        return self._url(encode_cursor(PREVIOUS, self.object_list[0].pk))
+
+    @property
+    def next_url(self):
+        return self._url(encode_cursor(NEXT, self.object_list[-1].pk))
+
+    @property
+    def last_url(self):
+        return self._url(encode_cursor(LAST))
+
+
+def cursor_direction(queryset, ordering=None) -> Optional[bool]:
+    """``True`` si se ordena por id descendente, ``False`` si ascendente.
+
+    Si el queryset no está ordenado se usa ``ordering``, el orden declarado
+    en la vista. Devuelve ``None`` cuando el orden no es solo por id o no
+    hay ningún orden, y no se puede usar un cursor.
+    """
+    if not isinstance(queryset, QuerySet):
+        return None
+    if queryset.ordered:
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+    if isinstance(ordering, str):
+        ordering = (ordering,)
+    ordering = tuple(ordering or ())
+    if ordering in (("-id",), ("-pk",)):
+        return True
+    if ordering in (("id",), ("pk",)):
+        return False
+    return None
+
+
+def paginate_by_cursor(
+    queryset, page_size, request, page_kwarg="page", descending=True
+):
+    forward, backward = ("-id", "id") if descending else ("id", "-id")
+    after, before = (
+        ("id__lt", "id__gt") if descending else ("id__gt", "id__lt")
+    )
+    kind, value = decode_cursor(request.GET.get(page_kwarg) or "")
+
+    if kind in (PREVIOUS, LAST):
+        if kind == PREVIOUS:
+            queryset = queryset.filter(**{before: value})
+        items = list(queryset.order_by(backward)[: page_size + 1])
+        has_previous = len(items) > page_size
+        items = items[:page_size][::-1]
+        has_next = kind == PREVIOUS
+    else:
+        if kind == NEXT:
+            queryset = queryset.filter(**{after: value})
+        items = list(queryset.order_by(forward)[: page_size + 1])
+        has_next = len(items) > page_size
+        items = items[:page_size]
+        has_previous = kind == NEXT
+    if not items:
+        # cursor fuera de rango: solo se ofrece volver a la primera página
+        has_next, has_previous = False, kind is not None
+    return CursorPage(items, has_next, has_previous, request, page_kwarg)
+
+
+class CursorPaginationMixin:
+    """Usa cursores en un ``ListView`` cuando el orden es solo por id.
+
+    Con cualquier otro orden (por ejemplo, por relevancia), sin orden o con
+    listas se pagina por número, sin contar exactamente los listados
+    grandes.
+    """
+
+    paginator_class = ApproximateCountPaginator
+
+    def paginate_queryset(self, queryset, page_size):
+        descending = cursor_direction(queryset, self.get_ordering())
+        if descending is None:
+            return super().paginate_queryset(queryset, page_size)
+        page = paginate_by_cursor(
+            queryset, page_size, self.request, self.page_kwarg, descending
+        )
+        return None, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,740 @@
+import datetime
+import io
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+from django import urls
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+import rrgg.models
+from rrgg import commissions, pricing, totals
+from rrggweb.exports import QUOTATION_REPORT_TEMPLATE, load_template
+from rrggweb.pagination import (
+    NEXT,
+    CursorPage,
+    cursor_direction,
+    encode_cursor,
+    paginate_by_cursor,
+)
+from rrggweb.utils import to_decimal
+
+
+class QuotationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role = rrgg.models.Role.objects.create(name="Asesor")
+        cls.seller = rrgg.models.Consultant.objects.create(
+            given_name="Ana", first_surname="Ramos", role=role
+        )
+        cls.dni = rrgg.models.DocumentType.objects.create(
+            code="DNI", name="DNI", min_length=8, max_length=8
+        )
+        cls.ruc = rrgg.models.DocumentType.objects.create(
+            code="RUC", name="RUC", min_length=11, max_length=11
+        )
+        cls.use_type = rrgg.models.UseType.objects.create(name="PARTICULAR")
+        cls.currency = rrgg.models.Currency.objects.create(
+            name="SOLES", symbol="S/"
+        )
+        cls.risk = rrgg.models.Risk.objects.create(name="VEHICULAR")
+        insurer = rrgg.models.InsuranceVehicle.objects.create(name="RIMAC")
+        cls.ratio = rrgg.models.InsuranceVehicleRatio.objects.create(
+            tax=Decimal("0.18"),
+            emission_right=Decimal("0.03"),
+            insurance_vehicle=insurer,
+        )
+        cls.user = get_user_model().objects.create_user("asesor")
+        # IssuanceInsurance.save asigna el estado 1 a las emisiones nuevas
+        rrgg.models.IssuanceInsuranceStatus.objects.create(
+            id=1, name="PENDIENTE"
+        )
+        cls.issuance_type = rrgg.models.IssuanceInsuranceType.objects.create(
+            name="Venta nueva"
+        )
+        cls.payment_method = rrgg.models.PaymentMethod.objects.create(
+            name="CONTADO"
+        )
+        risk_insurer = rrgg.models.RiskInsuranceVehicle.objects.create(
+            risk=cls.risk, insurance_vehicle=insurer
+        )
+        cls.plan = rrgg.models.InsurancePlan.objects.create(
+            name="Plan",
+            commission=Decimal("0.25"),
+            risk_insurance_vehicle=risk_insurer,
+        )
+
+    def create_quotations(self, count):
+        start = rrgg.models.QuotationInsuranceVehicle.objects.count()
+        for number in range(start, start + count):
+            if number % 2:
+                customer = rrgg.models.CustomerMembership.objects.create(
+                    natural_person=rrgg.models.NaturalPerson.objects.create(
+                        document_type=self.dni,
+                        document_number=f"{number:08d}",
+                        given_name=f"Juan {number}",
+                        first_surname="Pérez",
+                        birthdate=datetime.date(1990, 1, 1),
+                    ),
+                    seller=self.seller,
+                )
+            else:
+                customer = rrgg.models.CustomerMembership.objects.create(
+                    legal_person=rrgg.models.LegalPerson.objects.create(
+                        document_type=self.ruc,
+                        document_number=f"20{number:09d}",
+                        registered_name=f"Empresa {number} SAC",
+                    ),
+                    seller=self.seller,
+                )
+            vehicle = rrgg.models.Vehicle.objects.create(
+                brand="TOYOTA",
+                vehicle_model="YARIS",
+                plate=f"ABC{number:03d}",
+                fabrication_year=2020,
+                engine="E1",
+                chassis="C1",
+                seat_number=5,
+                use_type=self.use_type,
+            )
+            quotation = rrgg.models.QuotationInsuranceVehicle.objects.create(
+                risk=self.risk,
+                consultant_registrar=self.seller,
+                consultant_seller=self.seller,
+                customer=customer,
+                currency=self.currency,
+                source="quotation",
+                insured_amount=Decimal("20000"),
+                vehicle=vehicle,
+            )
+            rrgg.models.QuotationInsuranceVehiclePremium.objects.create(
+                amount=Decimal("1000"),
+                rate=Decimal("0.05"),
+                insurance_vehicle_ratio=self.ratio,
+                quotation_insurance_vehicle=quotation,
+            )
+
+    def create_issuance(self, premiums, **fields):
+        issuance = rrgg.models.IssuanceInsuranceVehicle.objects.create(
+            **{
+                "policy": "POL-1",
+                "collection_document": "DOC-1",
+                "issuance_date": datetime.date(2024, 3, 15),
+                "initial_validity": datetime.date(2024, 3, 15),
+                "final_validity": datetime.date(2025, 3, 15),
+                "plan_commission_percentage": Decimal("0.25"),
+                "seller_commission_percentage": Decimal("0.5"),
+                "issuance_type": self.issuance_type,
+                "consultant_registrar": self.seller,
+                "consultant_seller": self.seller,
+                "insurance_plan": self.plan,
+                "payment_method": self.payment_method,
+                **fields,
+            }
+        )
+        issuance.quotation_vehicle_premiums.add(*premiums)
+        return issuance
+
+
+def legacy_totals(issuance):
+    """Montos con las fórmulas de las antiguas propiedades de la emisión."""
+    premiums = list(issuance.quotation_vehicle_premiums.order_by("id"))
+    amount = sum(premium.amount for premium in premiums)
+    net_premium = to_decimal(amount)
+    emission_right = to_decimal(
+        net_premium * premiums[0].emission_right_percentage
+    )
+    commercial_premium = to_decimal(net_premium + emission_right)
+    tax = to_decimal(commercial_premium * premiums[0].tax_percentage)
+    net_commission = to_decimal(amount * issuance.plan_commission_percentage)
+    seller_commission = to_decimal(
+        issuance.seller_commission_percentage * net_commission
+    )
+    return {
+        "insured_amount": to_decimal(
+            sum(
+                premium.quotation_insurance_vehicle.insured_amount
+                for premium in premiums
+            )
+        ),
+        "net_premium": net_premium,
+        "emission_right": emission_right,
+        "commercial_premium": commercial_premium,
+        "tax": tax,
+        "total_premium": commercial_premium + tax,
+        "net_commission": net_commission,
+        "seller_commission": seller_commission,
+        "kcs_commission": to_decimal(net_commission - seller_commission),
+    }
+
+
+class QuotationListQueriesTest(QuotationTestCase):
+    def count_queries(self, params=None):
+        self.client.force_login(self.user)
+        url = urls.reverse(
+            "rrggweb:quotation:insurance:vehicle:list",
+            kwargs={"registrar_id": self.seller.id},
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_constant_queries(self):
+        self.create_quotations(1)
+        queries = self.count_queries()
+        self.create_quotations(11)
+        self.assertEqual(self.count_queries(), queries)
+
+    def test_constant_queries_when_searching(self):
+        self.create_quotations(1)
+        queries = self.count_queries({"q": "ABC"})
+        self.create_quotations(11)
+        self.assertEqual(self.count_queries({"q": "ABC"}), queries)
+
+
+class GlobalSearchQueriesTest(QuotationTestCase):
+    def search(self, query):
+        self.client.force_login(self.user)
+        url = urls.reverse(
+            "rrggweb:search", kwargs={"registrar_id": self.seller.id}
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(context.captured_queries)
+
+    def test_constant_queries(self):
+        self.create_quotations(2)
+        result, queries = self.search("ABC")
+        self.assertEqual(
+            [group["kind"] for group in result["groups"]],
+            ["vehicle", "quotation"],
+        )
+        self.create_quotations(10)
+        result, more_queries = self.search("ABC")
+        self.assertEqual(more_queries, queries)
+        self.assertEqual(
+            [len(group["results"]) for group in result["groups"]], [5, 5]
+        )
+
+
+class PremiumBreakdownTest(QuotationTestCase):
+    # 41.50 deja medio centavo en el derecho de emisión (1.245) y en el IGV
+    # (7.695); 100.50, en el derecho de emisión (3.015)
+    amounts = ("41.50", "100.50", "0.50", "1234.55", "333.33")
+
+    def setUp(self):
+        self.create_quotations(len(self.amounts))
+        premiums = rrgg.models.QuotationInsuranceVehiclePremium.objects
+        customer = rrgg.models.CustomerMembership.objects.order_by("id")[0]
+        rrgg.models.QuotationInsuranceVehicle.objects.update(
+            source="new_sale", customer=customer
+        )
+        premiums.update(in_progress=True)
+        for premium, amount in zip(premiums.order_by("id"), self.amounts):
+            premium.amount = Decimal(amount)
+            premium.save()
+        self.url = urls.reverse(
+            "rrggweb:issuance:insurance:vehicle:list_premiums_ns",
+            kwargs={
+                "registrar_id": self.seller.id,
+                "seller_id": self.seller.id,
+                "customer_id": customer.id,
+            },
+        )
+
+    def test_annotations_match_properties(self):
+        premium_model = rrgg.models.QuotationInsuranceVehiclePremium
+        premiums = premium_model.objects.with_breakdown()
+        self.assertEqual(len(premiums), len(self.amounts))
+        for premium in premiums:
+            for field in (
+                "emission_right",
+                "commercial_premium",
+                "tax",
+                "total",
+            ):
+                with self.subTest(amount=premium.amount, field=field):
+                    self.assertEqual(
+                        getattr(premium, f"computed_{field}"),
+                        getattr(premium, field),
+                    )
+
+    def list_totals(self, params):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [premium.total for premium in response.context["object_list"]]
+
+    def test_default_ordering_uses_cursor_pagination(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        page = response.context["page_obj"]
+        self.assertIsInstance(page, CursorPage)
+        premiums = rrgg.models.QuotationInsuranceVehiclePremium.objects
+        self.assertEqual(
+            [premium.id for premium in page],
+            list(premiums.order_by("-id").values_list("id", flat=True)),
+        )
+        # ordenar por total vuelve a la paginación numerada
+        response = self.client.get(self.url, {"ordering": "total"})
+        self.assertNotIsInstance(response.context["page_obj"], CursorPage)
+
+    def test_ordering_and_min_total(self):
+        premium_model = rrgg.models.QuotationInsuranceVehiclePremium
+        expected = sorted(
+            premium.total for premium in premium_model.objects.all()
+        )
+        self.assertEqual(self.list_totals({"ordering": "total"}), expected)
+        self.assertEqual(
+            self.list_totals({"ordering": "-total"}), expected[::-1]
+        )
+        self.assertEqual(
+            self.list_totals({"ordering": "total", "min_total": expected[2]}),
+            expected[2:],
+        )
+        self.assertEqual(
+            self.list_totals({"ordering": "total", "min_total": "no"}),
+            expected,
+        )
+
+
+class QuoteAllTest(QuotationTestCase):
+    def setUp(self):
+        # los ratios de setUpTestData no se confirman en TestCase: se simula
+        # la confirmación para que current_ratios vuelva a cachear
+        with self.captureOnCommitCallbacks(execute=True):
+            pricing.invalidate_ratios()
+
+    def test_latest_ratio_per_insurer(self):
+        self.create_quotations(1)
+        quotation = rrgg.models.QuotationInsuranceVehicle.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            pacifico = rrgg.models.InsuranceVehicle.objects.create(
+                name="PACIFICO"
+            )
+            for emission_right in ("0.0300", "0.0250"):
+                latest = rrgg.models.InsuranceVehicleRatio.objects.create(
+                    tax=Decimal("0.18"),
+                    emission_right=Decimal(emission_right),
+                    insurance_vehicle=pacifico,
+                )
+        pricing.quote_all(quotation)
+        # los ratios quedan en memoria: solo se consultan las primas
+        with self.assertNumQueries(1):
+            quotes = pricing.quote_all(quotation)
+        self.assertEqual(
+            [quote.insurance_vehicle.name for quote in quotes],
+            ["PACIFICO", "RIMAC"],
+        )
+        self.assertEqual(quotes[0].ratio, latest)
+        self.assertIsNone(quotes[0].premium)
+        self.assertEqual(quotes[1].ratio, self.ratio)
+        self.assertEqual(quotes[1].figures["emission_right"], Decimal("30"))
+        self.assertEqual(quotes[1].figures["total"], Decimal("1215.40"))
+
+    def test_new_ratio_discards_cached_ratios(self):
+        insurer = self.ratio.insurance_vehicle
+        self.assertEqual(insurer.last_ratio, self.ratio)
+        with self.assertNumQueries(0):
+            insurer.last_ratio
+        ratio = rrgg.models.InsuranceVehicleRatio.objects.create(
+            tax=Decimal("0.18"),
+            emission_right=Decimal("0.0250"),
+            insurance_vehicle=insurer,
+        )
+        self.assertEqual(insurer.last_ratio, ratio)
+
+    def test_rolled_back_ratio_is_not_cached(self):
+        insurer = self.ratio.insurance_vehicle
+        self.assertEqual(insurer.last_ratio, self.ratio)
+        with transaction.atomic():
+            rrgg.models.InsuranceVehicleRatio.objects.create(
+                tax=Decimal("0.18"),
+                emission_right=Decimal("0.0250"),
+                insurance_vehicle=insurer,
+            )
+            self.assertNotEqual(insurer.last_ratio, self.ratio)
+            transaction.set_rollback(True)
+        self.assertEqual(insurer.last_ratio, self.ratio)
+        self.assertEqual(pricing.current_ratios(), [self.ratio])
+
+
+class RatioAsOfTest(QuotationTestCase):
+    def test_ratio_in_force_on_each_date(self):
+        insurer = self.ratio.insurance_vehicle
+        later = rrgg.models.InsuranceVehicleRatio.objects.create(
+            tax=Decimal("0.18"),
+            emission_right=Decimal("0.0250"),
+            insurance_vehicle=insurer,
+        )
+        rrgg.models.InsuranceVehicleRatio.objects.filter(
+            id=self.ratio.id
+        ).update(created=timezone.make_aware(datetime.datetime(2024, 1, 10)))
+        rrgg.models.InsuranceVehicleRatio.objects.filter(id=later.id).update(
+            created=timezone.make_aware(datetime.datetime(2024, 6, 1, 15))
+        )
+        pairs = [
+            (insurer.id, datetime.date(2024, 1, 9)),
+            (insurer.id, datetime.date(2024, 5, 31)),
+            (insurer.id, datetime.date(2024, 6, 1)),
+            (insurer.id, timezone.make_aware(datetime.datetime(2024, 6, 1))),
+        ]
+        with self.assertNumQueries(1):
+            ratios = pricing.ratios_as_of(pairs)
+        self.assertEqual(
+            [ratios[pair] for pair in pairs],
+            [None, self.ratio, later, self.ratio],
+        )
+
+
+class ImportHistoricalTest(TestCase):
+    header = "policy,document_number,year,months,currency,net_premium"
+
+    def import_rows(self, *rows):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "historico.csv"
+            path.write_text("\n".join([self.header, *rows]), encoding="utf-8")
+            output, self.errors = io.StringIO(), io.StringIO()
+            call_command(
+                "import_historical", path, stdout=output, stderr=self.errors
+            )
+        return output.getvalue().splitlines()[-1]
+
+    def test_matches_rows_with_null_fields_and_other_month_case(self):
+        rrgg.models.HistoricalData.objects.create(
+            policy="P-1",
+            document_number=None,
+            year="2024",
+            months="agosto",
+            currency="SOLES",
+            net_premium="100",
+        )
+        self.assertEqual(
+            self.import_rows("P-1,,2024,AGOSTO,SOLES,100"),
+            "0 filas nuevas, 0 actualizadas, 1 sin cambios, 0 rechazadas.",
+        )
+        self.assertEqual(
+            self.import_rows("P-1,,2024,Agosto,SOLES,150"),
+            "0 filas nuevas, 1 actualizadas, 0 sin cambios, 0 rechazadas.",
+        )
+        data = rrgg.models.HistoricalData.objects.get()
+        self.assertEqual(data.months, "AGOSTO")
+        self.assertEqual(data.record.net_premium, Decimal("150"))
+
+    def test_rejects_rows_sharing_the_key(self):
+        self.assertEqual(
+            self.import_rows(
+                "P-1,D-1,2024,AGOSTO,SOLES,100",
+                "P-1,D-1,2024,agosto,SOLES,150",
+            ),
+            "1 filas nuevas, 0 actualizadas, 0 sin cambios, 1 rechazadas.",
+        )
+        self.assertEqual(
+            self.errors.getvalue(),
+            (
+                "historico.csv:3 rechazada: misma póliza, documento, año y mes"
+                " que historico.csv:2\n"
+            ),
+        )
+        data = rrgg.models.HistoricalData.objects.get()
+        self.assertEqual(data.record.net_premium, Decimal("100"))
+
+    def test_rejects_keys_matching_several_rows(self):
+        for net_premium in ("100", "150"):
+            rrgg.models.HistoricalData.objects.create(
+                policy="P-1",
+                document_number="D-1",
+                year="2024",
+                months="AGOSTO",
+                net_premium=net_premium,
+            )
+        self.assertEqual(
+            self.import_rows("P-1,D-1,2024,AGOSTO,SOLES,200"),
+            "0 filas nuevas, 0 actualizadas, 0 sin cambios, 1 rechazadas.",
+        )
+        self.assertIn("2 filas existentes", self.errors.getvalue())
+        self.assertEqual(
+            list(
+                rrgg.models.HistoricalData.objects.order_by("id").values_list(
+                    "net_premium", flat=True
+                )
+            ),
+            ["100", "150"],
+        )
+
+
+class IssuanceTotalsTest(QuotationTestCase):
+    def stored_totals(self, issuance):
+        issuance.refresh_from_db()
+        return {
+            field: getattr(issuance, field) for field in totals.TOTAL_FIELDS
+        }
+
+    def test_stored_totals_follow_premiums(self):
+        self.create_quotations(2)
+        premiums = list(
+            rrgg.models.QuotationInsuranceVehiclePremium.objects.order_by("id")
+        )
+        premiums[0].amount = Decimal("100.50")
+        premiums[0].save()
+        issuance = self.create_issuance(premiums[:1])
+        # 100.50 * 0.25 = 25.125 redondea la mitad hacia arriba
+        self.assertEqual(
+            self.stored_totals(issuance)["net_commission"], Decimal("25.13")
+        )
+        self.assertEqual(self.stored_totals(issuance), legacy_totals(issuance))
+
+        issuance.quotation_vehicle_premiums.add(premiums[1])
+        self.assertEqual(self.stored_totals(issuance), legacy_totals(issuance))
+
+        premiums[1].amount = Decimal("333.33")
+        premiums[1].save()
+        self.assertEqual(self.stored_totals(issuance), legacy_totals(issuance))
+
+        issuance.seller_commission_percentage = Decimal("0.3")
+        issuance.save()
+        self.assertEqual(self.stored_totals(issuance), legacy_totals(issuance))
+
+        issuance.quotation_vehicle_premiums.remove(premiums[0])
+        self.assertEqual(self.stored_totals(issuance), legacy_totals(issuance))
+
+    def check_totals(self):
+        output = io.StringIO()
+        call_command(
+            "backfill_issuance_totals",
+            "--check",
+            stdout=output,
+            stderr=io.StringIO(),
+        )
+        return output.getvalue().strip()
+
+    def test_backfill_check(self):
+        self.create_quotations(2)
+        premiums = rrgg.models.QuotationInsuranceVehiclePremium.objects.all()
+        issuance = self.create_issuance(premiums)
+        self.assertEqual(self.check_totals(), "Sin diferencias.")
+
+        # update() no dispara las señales que recalculan los montos
+        rrgg.models.IssuanceInsuranceVehicle.objects.filter(
+            id=issuance.id
+        ).update(net_premium=Decimal("1"), tax=Decimal("2"))
+        self.assertEqual(self.check_totals(), "2 diferencias.")
+
+        call_command("backfill_issuance_totals", stdout=io.StringIO())
+        self.assertEqual(self.check_totals(), "Sin diferencias.")
+        self.assertEqual(self.stored_totals(issuance), legacy_totals(issuance))
+
+    def test_with_totals_matches_stored_columns(self):
+        self.create_quotations(6)
+        premiums = list(
+            rrgg.models.QuotationInsuranceVehiclePremium.objects.order_by("id")
+        )
+        # montos con medio centavo en la prima, el derecho de emisión, el
+        # IGV y las comisiones
+        for premium, amount in zip(
+            premiums,
+            ("100.50", "100.50", "0.50", "1234.55", "333.33", "99.99"),
+        ):
+            premium.amount = Decimal(amount)
+            premium.save()
+        self.create_issuance(premiums[:1])
+        self.create_issuance(
+            premiums[1:3], seller_commission_percentage=Decimal("0.125")
+        )
+        self.create_issuance(
+            premiums[3:6],
+            plan_commission_percentage=Decimal("0.1750"),
+            seller_commission_percentage=Decimal("0.3333"),
+        )
+        self.create_issuance([])
+
+        issuances = rrgg.models.IssuanceInsuranceVehicle.objects.with_totals()
+        self.assertEqual(len(issuances), 4)
+        for issuance in issuances:
+            for field in totals.TOTAL_FIELDS:
+                with self.subTest(issuance=issuance.id, field=field):
+                    self.assertEqual(
+                        getattr(issuance, f"computed_{field}"),
+                        getattr(issuance, field),
+                    )
+
+
+class CursorPaginationTest(QuotationTestCase):
+    def setUp(self):
+        self.create_quotations(5)
+        self.queryset = rrgg.models.QuotationInsuranceVehicle.objects.all()
+        self.ids = list(
+            self.queryset.order_by("-id").values_list("id", flat=True)
+        )
+
+    def page(self, url="?"):
+        request = RequestFactory().get("/", QueryDict(url[1:]))
+        return paginate_by_cursor(self.queryset, 2, request)
+
+    def assertPage(self, page, ids, has_previous, has_next):
+        self.assertEqual([item.id for item in page], ids)
+        self.assertEqual(page.has_previous(), has_previous)
+        self.assertEqual(page.has_next(), has_next)
+
+    def test_direction(self):
+        self.assertIsNone(cursor_direction(self.queryset))
+        self.assertTrue(cursor_direction(self.queryset, ["-id"]))
+        self.assertFalse(cursor_direction(self.queryset, "id"))
+        self.assertTrue(cursor_direction(self.queryset.order_by("-pk")))
+        self.assertIsNone(
+            cursor_direction(self.queryset.order_by("created"), ["-id"])
+        )
+        self.assertIsNone(cursor_direction(list(self.queryset)))
+
+    def test_next_previous_and_last(self):
+        first = self.page()
+        self.assertPage(first, self.ids[:2], False, True)
+        second = self.page(first.next_url)
+        self.assertPage(second, self.ids[2:4], True, True)
+        third = self.page(second.next_url)
+        self.assertPage(third, self.ids[4:], True, False)
+        self.assertPage(
+            self.page(third.previous_url), self.ids[2:4], True, True
+        )
+        self.assertPage(
+            self.page(second.previous_url), self.ids[:2], False, True
+        )
+        self.assertPage(self.page(first.last_url), self.ids[3:], True, False)
+
+    def test_out_of_range_and_invalid_cursors(self):
+        page = self.page(f"?page={encode_cursor(NEXT, self.ids[-1])}")
+        self.assertPage(page, [], True, False)
+        self.assertEqual(page.previous_url, page.first_url)
+        self.assertPage(
+            self.page("?page=no-es-un-cursor"), self.ids[:2], False, True
+        )
+
+
+class CommissionStatementTest(QuotationTestCase):
+    def setUp(self):
+        self.create_quotations(1)
+        premium = rrgg.models.QuotationInsuranceVehiclePremium.objects.get()
+        self.issuance = self.create_issuance([premium])
+        self.endorsement = self.create_endorsement(self.issuance)
+
+    def create_endorsement(self, issuance, **fields):
+        vehicle = rrgg.models.Vehicle.objects.get()
+        return rrgg.models.EndorsementVehicle.objects.create(
+            **{
+                "vehicle": vehicle,
+                "issuance": issuance,
+                "insured_amount": Decimal("20000"),
+                "net_premium": Decimal("200"),
+                "rate": Decimal("0.01"),
+                "collection_document": "END-1",
+                "issuance_date": datetime.date(2024, 3, 20),
+                "initial_validity": datetime.date(2024, 3, 20),
+                "final_validity": datetime.date(2025, 3, 15),
+                "plan_commission_percentage": Decimal("0.25"),
+                "seller_commission_percentage": Decimal("0.5"),
+                "detail": "Cambio de uso",
+                "currency": self.currency,
+                "payment_method": self.payment_method,
+                **fields,
+            }
+        )
+
+    def test_issuances_and_endorsements(self):
+        with self.assertNumQueries(2):
+            statement = commissions.compute_statement(2024, 3)
+        self.assertEqual(
+            statement,
+            [
+                commissions.StatementRow(
+                    consultant_id=self.seller.id,
+                    consultant="Ana Ramos",
+                    kind="Venta nueva",
+                    currency="SOLES",
+                    count=1,
+                    net_premium=Decimal("1000.00"),
+                    net_commission=Decimal("250.00"),
+                    seller_commission=Decimal("125.00"),
+                    kcs_commission=Decimal("125.00"),
+                ),
+                commissions.StatementRow(
+                    consultant_id=self.seller.id,
+                    consultant="Ana Ramos",
+                    kind=commissions.ENDORSEMENT,
+                    currency="SOLES",
+                    count=1,
+                    net_premium=Decimal("200.00"),
+                    net_commission=Decimal("50.00"),
+                    seller_commission=Decimal("25.00"),
+                    kcs_commission=Decimal("25.00"),
+                ),
+            ],
+        )
+        self.assertEqual(commissions.compute_statement(2024, 4), [])
+        self.assertEqual(
+            commissions.compute_statement(
+                2024, 3, consultant_id=self.seller.id + 1
+            ),
+            [],
+        )
+
+    def test_endorsements_without_issuance(self):
+        self.create_endorsement(None)
+        self.assertEqual(
+            [row.count for row in commissions.compute_statement(2024, 3)],
+            [1, 1],
+        )
+        self.assertEqual(commissions.unassigned_endorsements(2024, 3), 1)
+
+    def test_closed_month_is_cached_until_invalidated(self):
+        self.assertTrue(commissions.is_closed(2024, 3))
+        statement = commissions.statement(2024, 3)
+        # update() no dispara las señales que invalidan la liquidación
+        rrgg.models.EndorsementVehicle.objects.filter(
+            id=self.endorsement.id
+        ).update(net_premium=Decimal("400"))
+        self.assertEqual(commissions.statement(2024, 3), statement)
+
+        commissions.invalidate()
+        self.assertEqual(
+            commissions.statement(2024, 3)[1].net_premium, Decimal("400.00")
+        )
+
+        self.endorsement.refresh_from_db()
+        self.endorsement.net_premium = Decimal("300")
+        self.endorsement.save()
+        self.assertEqual(
+            commissions.statement(2024, 3)[1].net_premium, Decimal("300.00")
+        )
+
+    def test_invalid_period_falls_back_to_today(self):
+        self.client.force_login(self.user)
+        url = urls.reverse(
+            "rrggweb:commission:statement",
+            kwargs={"registrar_id": self.seller.id},
+        )
+        today = timezone.localdate()
+        for params in ({"year": "0"}, {"year": "99999", "month": "13"}):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context["selected_year"], today.year)
+
+
+class LoadTemplateTest(TestCase):
+    def test_copies_are_independent(self):
+        first = load_template(QUOTATION_REPORT_TEMPLATE)
+        original = first.active["C6"].value
+        first.active["C6"] = "JUAN PÉREZ"
+        first.active.title = "Modificada"
+        second = load_template(QUOTATION_REPORT_TEMPLATE)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.active["C6"].value, original)
+        self.assertNotEqual(second.active.title, "Modificada")
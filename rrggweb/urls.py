@@ -219,6 +219,11 @@ issuance_insurance_vehicle_urlpatterns = (
             views.IIVListView.as_view(),
             name="list",
         ),
+        path(
+            "list/export/",
+            views.IIVExportView.as_view(),
+            name="export",
+        ),
         # ISSUANCE DETAIL
         path(
             "detail/<int:issuance_id>/",
@@ -1000,6 +1005,16 @@ historical_data_urlpatterns = (
             views.HistoricalDataListView.as_view(),
             name="list",
         ),
+        path(
+            "table/",
+            views.HistoricalDataTableView.as_view(),
+            name="table",
+        ),
+        path(
+            "export/",
+            views.HistoricalDataExportView.as_view(),
+            name="export",
+        ),
         path(
             "detail/<int:pk>/",
             views.HistoricalDataDetailView.as_view(),
@@ -1014,6 +1029,22 @@ historical_data_urlpatterns = (
     "historical_data",
 )
 
+commission_urlpatterns = (
+    [
+        path(
+            "statement/",
+            views.CommissionStatementView.as_view(),
+            name="statement",
+        ),
+        path(
+            "export/",
+            views.CommissionStatementExportView.as_view(),
+            name="export",
+        ),
+    ],
+    "commission",
+)
+
 
 app_name = "rrggweb"
 
@@ -1036,6 +1067,11 @@ urlpatterns = [
         name="collection",
     ),
     path("<int:registrar_id>/home/", views.HomeView.as_view(), name="home"),
+    path(
+        "<int:registrar_id>/search/",
+        views.GlobalSearchView.as_view(),
+        name="search",
+    ),
     path("<int:registrar_id>/quotation/", include(quotation_urlpatterns)),
     path("<int:registrar_id>/issuance/", include(issuance_urlpatterns)),
     path("<int:registrar_id>/collection/", include(collection_urlpatterns)),
@@ -1047,6 +1083,7 @@ urlpatterns = [
         "<int:registrar_id>/customer_membership/",
         include(customer_membership_urlpatterns),
     ),
+    path("<int:registrar_id>/commission/", include(commission_urlpatterns)),
 ]
 
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -1,4 +1,5 @@
 from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
 from typing import NamedTuple
 
 
@@ -7,14 +8,28 @@ class SeguroItem(NamedTuple):
     url: str
 
 
+TWO_PLACES = Decimal("0.01")
+
+
+@lru_cache(maxsize=None)
+def quantum(places: int) -> Decimal:
+    """``Decimal`` con el exponente para redondear a ``places`` decimales."""
+    return Decimal(1).scaleb(-places)
+
+
+def round_half_up(amount: Decimal, places: int = 2) -> Decimal:
+    return amount.quantize(quantum(places), rounding=ROUND_HALF_UP)
+
+
 def to_decimal(amount):
+    # los montos cuya representación no tiene punto decimal (enteros,
+    # Decimal("5")) se devuelven sin redondear, como siempre
+    if type(amount) is Decimal:
+        if "." in str(amount):
+            return amount.quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+        return amount
     str_amount = str(amount)
-    dot_index = str_amount.find(".")
-    if dot_index != -1:
-        # truncamiento a 2 dígitos
-        # str_amount = str_amount[: dot_index + 3]
+    if "." in str_amount:
         # redondeo a 2 dígitos
-        str_amount = Decimal(str_amount).quantize(
-            Decimal("0.00"), rounding=ROUND_HALF_UP
-        )
+        return Decimal(str_amount).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
     return Decimal(str_amount)
@@ -1,18 +1,33 @@
+import datetime
 import os
 import re
-from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
 
 from django import shortcuts, urls
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import views as views_auth
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count, FloatField, Q, Sum
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import (
+    Case,
+    CharField,
+    F,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
 from django.db.models.deletion import ProtectedError
-from django.db.models.functions import Cast, ExtractMonth, ExtractYear
+from django.db.models.functions import Concat
 from django.forms import modelformset_factory
-from django.http import FileResponse, HttpResponse
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.views.generic import (
     CreateView,
     DeleteView,
@@ -25,9 +40,22 @@ from django.views.generic import (
 )
 
 import rrgg.models
+from rrgg import commissions, global_search
 from rrgg import mixins as rrgg_mixins
+from rrgg import pricing, rollup
+from rrgg.cache import cached_result
+from rrgg.historical import MONTH_NUMBERS, MONTHS
 
 from . import forms
+from .counts import approximate_count
+from .dashboard import load_dashboard
+from .exports import (
+    QUOTATION_REPORT_COLUMNS,
+    QUOTATION_REPORT_TEMPLATE,
+    SpreadsheetExportMixin,
+    load_template,
+)
+from .pagination import CursorPaginationMixin
 from .utils import SeguroItem, to_decimal
 
 # import count
@@ -375,45 +403,53 @@ class UpdateOwnerSupportView(PersonFormSupportView, UpdateView):
 # QUOTATION
 
 
-class QuotationListSupportView(LoginRequiredMixin, ListView):
+class QuotationListSupportView(
+    LoginRequiredMixin, CursorPaginationMixin, ListView
+):
     model = rrgg.models.QuotationInsuranceVehicle
     paginate_by = 10
+    search_fields = [
+        "customer__natural_person__given_name",
+        "customer__natural_person__first_surname",
+        "customer__natural_person__second_surname",
+        "customer__natural_person__document_number",
+        "customer__legal_person__registered_name",
+        "customer__legal_person__general_manager",
+        "customer__legal_person__document_number",
+        "consultant_seller__given_name",
+        "consultant_seller__first_surname",
+        "vehicle__plate",
+    ]
 
     def get_queryset(self):
-        query = self.request.GET.get("q")
-        if query:
-            return rrgg.models.QuotationInsuranceVehicle.objects.filter(
-                Q(source="quotation"),
-                Q(customer__natural_person__given_name__icontains=query)
-                | Q(
-                    customer__natural_person__first_surname__icontains=query  # noqa: E501
-                )
-                | Q(
-                    customer__natural_person__second_surname__icontains=query  # noqa: E501
+        premium_model = rrgg.models.QuotationInsuranceVehiclePremium
+        queryset = (
+            super()
+            .get_queryset()
+            .filter(source="quotation")
+            .select_related(
+                "customer__natural_person",
+                "customer__legal_person",
+                "vehicle",
+                "consultant_seller",
+                "currency",
+            )
+            .prefetch_related(
+                Prefetch(
+                    "premiums",
+                    premium_model.objects.select_related(
+                        "insurance_vehicle_ratio__insurance_vehicle"
+                    ),
                 )
-                | Q(
-                    customer__natural_person__document_number__icontains=query  # noqa: E501
-                )
-                | Q(
-                    customer__legal_person__registered_name__icontains=query  # noqa: E501
-                )
-                | Q(
-                    customer__legal_person__general_manager__icontains=query  # noqa: E501
-                )
-                | Q(
-                    customer__legal_person__document_number__icontains=query  # noqa: E501
-                )
-                | Q(consultant_seller__given_name__icontains=query)
-                | Q(consultant_seller__first_surname__icontains=query)
-                | Q(vehicle__plate__icontains=query),
-            ).order_by("-id")
-        else:
-            return (
-                super()
-                .get_queryset()
-                .filter(source="quotation")
-                .order_by("-id")
             )
+        )
+        query = self.request.GET.get("q")
+        if query:
+            condition = Q()
+            for field in self.search_fields:
+                condition |= Q(**{f"{field}__icontains": query})
+            queryset = queryset.filter(condition)
+        return queryset.order_by("-id")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -495,9 +531,41 @@ class DetailQuotationSupportView(LoginRequiredMixin, DetailView):
 # PREMIUM
 
 
-class PremiumListSupportView(LoginRequiredMixin, ListView):
+class PremiumListSupportView(
+    LoginRequiredMixin, CursorPaginationMixin, ListView
+):
     model = rrgg.models.QuotationInsuranceVehiclePremium
     paginate_by = 10
+    # sin ?ordering se pagina por cursor sobre -id
+    ordering = ["-id"]
+    # ?ordering=-total ordena por prima total y ?min_total=5000 filtra,
+    # ambos sobre el desglose calculado en la base de datos
+    orderings = {
+        "total": ("computed_total", "id"),
+        "-total": ("-computed_total", "-id"),
+    }
+
+    def paginate_queryset(self, queryset, page_size):
+        # las subclases definen get_queryset; el desglose se aplica aquí
+        return super().paginate_queryset(
+            self.apply_breakdown(queryset), page_size
+        )
+
+    def apply_breakdown(self, queryset):
+        queryset = queryset.with_breakdown().select_related(
+            "quotation_insurance_vehicle__vehicle",
+            "quotation_insurance_vehicle__currency",
+        )
+        try:
+            min_total = Decimal(self.request.GET.get("min_total", ""))
+        except InvalidOperation:
+            min_total = None
+        if min_total is not None and min_total.is_finite():
+            queryset = queryset.filter(computed_total__gte=min_total)
+        ordering = self.orderings.get(self.request.GET.get("ordering"))
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -709,52 +777,67 @@ class SelectPlanSupportView(LoginRequiredMixin, FormView):
 # ISSUANCE
 
 
-class IssuanceListSupportView(LoginRequiredMixin, ListView):
+class IssuanceListSupportView(
+    LoginRequiredMixin, CursorPaginationMixin, ListView
+):
     template_name = "rrggweb/issuance/insurance/vehicle/list.html"
     model = rrgg.models.IssuanceInsuranceVehicle
     paginate_by = 10
 
     def get_queryset(self):
-        query = self.request.GET.get("q")
+        queryset = (
+            super()
+            .get_queryset()
+            .select_related("consultant_seller", "issuance_type", "status")
+        )
+        ordering = ["-id"]
+        query = self.request.GET.get("q", "").strip()
         if query:
-            return rrgg.models.IssuanceInsuranceVehicle.objects.filter(
-                Q(policy__icontains=query)
-                | Q(collection_document__icontains=query)
-                | Q(issuance_date__icontains=query)
-                | Q(issuance_type__name__icontains=query)
-                | Q(initial_validity__icontains=query)
-                | Q(final_validity__icontains=query)
-                | Q(payment_method__name__icontains=query)
-                | Q(consultant_seller__given_name__icontains=query)
-                | Q(consultant_seller__first_surname__icontains=query)
-                | Q(status__name__icontains=query)
-                | Q(
-                    quotation_vehicle_premiums__quotation_insurance_vehicle__customer__natural_person__given_name__icontains=query  # noqa: E501
-                )
-                | Q(
-                    quotation_vehicle_premiums__quotation_insurance_vehicle__customer__natural_person__first_surname__icontains=query  # noqa: E501
-                )
-                | Q(
-                    quotation_vehicle_premiums__quotation_insurance_vehicle__customer__natural_person__second_surname__icontains=query  # noqa: E501
-                )
-                | Q(
-                    quotation_vehicle_premiums__quotation_insurance_vehicle__customer__natural_person__document_number__icontains=query  # noqa: E501
-                )
-                | Q(
-                    quotation_vehicle_premiums__quotation_insurance_vehicle__customer__legal_person__registered_name__icontains=query  # noqa: E501
-                )
-                | Q(
-                    quotation_vehicle_premiums__quotation_insurance_vehicle__customer__legal_person__general_manager__icontains=query  # noqa: E501
-                )
-                | Q(
-                    quotation_vehicle_premiums__quotation_insurance_vehicle__customer__legal_person__document_number__icontains=query  # noqa: E501
-                )
-                | Q(
-                    quotation_vehicle_premiums__quotation_insurance_vehicle__vehicle__plate__icontains=query  # noqa: E501
-                )
-            ).order_by("-id")
-        else:
-            return super().get_queryset().order_by("-id")
+            # cada palabra se busca en el documento indexado de la emisión
+            for term in query.split():
+                queryset = queryset.filter(search_document__icontains=term)
+            queryset = queryset.annotate(
+                rank=TrigramWordSimilarity(query, "search_document")
+            )
+            ordering = ["-rank", *ordering]
+        return self.annotate_summary(queryset).order_by(*ordering)
+
+    @staticmethod
+    def annotate_summary(queryset):
+        """Anota los datos de la primera prima que se muestran por fila."""
+        premium = rrgg.models.QuotationInsuranceVehiclePremium.objects.filter(
+            issuances=OuterRef("pk")
+        ).order_by("id")
+        customer = "quotation_insurance_vehicle__customer__"
+        customer_name = Case(
+            When(
+                **{f"{customer}natural_person__isnull": False},
+                then=Concat(
+                    f"{customer}natural_person__given_name",
+                    Value(" "),
+                    f"{customer}natural_person__first_surname",
+                    Value(" "),
+                    f"{customer}natural_person__second_surname",
+                ),
+            ),
+            default=F(f"{customer}legal_person__registered_name"),
+            output_field=CharField(),
+        )
+        return queryset.annotate(
+            customer_name=Subquery(
+                premium.annotate(name=customer_name).values("name")[:1]
+            ),
+            plate=Subquery(
+                premium.values("quotation_insurance_vehicle__vehicle__plate")[
+                    :1
+                ]
+            ),
+            insurer_name=Subquery(
+                premium.values(
+                    "insurance_vehicle_ratio__insurance_vehicle__name"
+                )[:1]
+            ),
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -911,12 +994,19 @@ class CreateEndorsementSupportView(
         return initial
 
     def form_valid(self, form):
+        form.instance.issuance_id = self.kwargs["issuance_id"]
         form.instance.vehicle_id = self._get_data()[2].id
         form.instance.rate = form.cleaned_data["rate"] / 100
-        form.instance.tax_percentage = self._get_data()[1].tax
-        form.instance.emission_right_percentage = self._get_data()[
-            1
-        ].emission_right
+        # ratio de la aseguradora vigente a la fecha del endoso
+        ivr = self._get_data()[1]
+        ivr = (
+            pricing.ratio_as_of(
+                ivr.insurance_vehicle_id, form.cleaned_data["issuance_date"]
+            )
+            or ivr
+        )
+        form.instance.tax_percentage = ivr.tax
+        form.instance.emission_right_percentage = ivr.emission_right
         raw_percentage = form.cleaned_data["plan_commission_percentage"]
         form.instance.plan_commission_percentage = raw_percentage / 100
         # obtener comisión actual del vendedor
@@ -1029,210 +1119,104 @@ class HomeView(TemplateView):
         context = super().get_context_data(**kwargs)
         # Years
         years = (
-            rrgg.models.HistoricalData.objects.values_list("year", flat=True)
+            rrgg.models.MonthlyRollup.objects.values_list("year", flat=True)
             .distinct()
             .order_by("year")
         )
         context["years"] = years
-        selected_year = self.request.GET.get("year")
+        selected_year = self.request.GET.get("year", "")
+        selected_year = int(selected_year) if selected_year.isdigit() else None
         context["selected_year"] = selected_year
         # Months
-        month = [
-            "ENERO",
-            "FEBRERO",
-            "MARZO",
-            "ABRIL",
-            "MAYO",
-            "JUNIO",
-            "JULIO",
-            "AGOSTO",
-            "SEPTIEMBRE",
-            "OCTUBRE",
-            "NOVIEMBRE",
-            "DICIEMBRE",
-        ]
-        context["months"] = month
+        context["months"] = MONTHS
         selected_month = self.request.GET.get("months")
         context["selected_month"] = selected_month
 
-        data_filter = {}
-        if selected_year is not None:
-            data_filter["year"] = selected_year
-        if selected_month is not None:
-            data_filter["months"] = selected_month
-
-        # Histogram net_premium / soles
-        histogram_net_premium_in_soles = (
-            rrgg.models.HistoricalData.objects.filter(
-                currency="SOLES", **data_filter
-            )
-            .exclude(net_premium="")
-            .exclude(net_premium__isnull=True)
-            .values("year", "months", "insurance_vehicle")
-            .annotate(total=Sum(Cast("net_premium", FloatField())))
-            .order_by("year", "months", "insurance_vehicle")
-        )
-
-        context["histogram_net_premium_soles_series"] = [
-            round(item["total"], 2) for item in histogram_net_premium_in_soles
-        ]
-        context["histogram_net_premium_soles_labels"] = [
-            item["insurance_vehicle"]
-            for item in histogram_net_premium_in_soles
-        ]
-
-        # Histogram net_premium / dólares
-        histogram_net_premium_in_dollars = (
-            rrgg.models.HistoricalData.objects.filter(
-                currency="DOLARES", **data_filter
-            )
-            .exclude(net_premium="")
-            .exclude(net_premium__isnull=True)
-            .values("year", "months", "insurance_vehicle")
-            .annotate(total=Sum(Cast("net_premium", FloatField())))
-            .order_by("year", "months", "insurance_vehicle")
+        params = {
+            "year": selected_year,
+            "month": (
+                MONTH_NUMBERS.get(selected_month.upper(), 0)
+                if selected_month is not None
+                else None
+            ),
+        }
+        context["dashboard"] = cached_result(
+            "dashboard",
+            params,
+            lambda: load_dashboard(**params),
+            generation=rollup.GENERATION,
         )
+        return context
 
-        context["histogram_net_premium_dollars_series"] = [
-            round(item["total"], 2)
-            for item in histogram_net_premium_in_dollars
-        ]
-        context["histogram_net_premium_dollars_labels"] = [
-            item["insurance_vehicle"]
-            for item in histogram_net_premium_in_dollars
-        ]
-
-        # Histogram net_commission / soles
-        histogram_net_commission_in_soles = (
-            rrgg.models.HistoricalData.objects.filter(
-                currency="SOLES", **data_filter
-            )
-            .exclude(net_commission_amount="")
-            .exclude(net_commission_amount__isnull=True)
-            .values("year", "months", "consultant")
-            .annotate(total=Sum(Cast("net_commission_amount", FloatField())))
-            .order_by("year", "months", "consultant")
-        )
-        context["histogram_net_commission_soles_series"] = [
-            round(item["total"], 2)
-            for item in histogram_net_commission_in_soles
-        ]
-        context["histogram_net_commission_soles_labels"] = [
-            item["consultant"] for item in histogram_net_commission_in_soles
-        ]
-
-        # Histogram net_commission / dólares
-        histogram_net_commission_in_dollars = (
-            rrgg.models.HistoricalData.objects.filter(
-                currency="DOLARES", **data_filter
-            )
-            .exclude(net_commission_amount="")
-            .exclude(net_commission_amount__isnull=True)
-            .values("year", "months", "consultant")
-            .annotate(total=Sum(Cast("net_commission_amount", FloatField())))
-            .order_by("year", "months", "consultant")
-        )
-        context["histogram_net_commission_dollars_series"] = [
-            round(item["total"], 2)
-            for item in histogram_net_commission_in_dollars
-        ]
-        context["histogram_net_commission_dollars_labels"] = [
-            item["consultant"] for item in histogram_net_commission_in_dollars
-        ]
 
-        # TOTAL COUNT COTIZACIONES Y EMISIONES POR ASEGURADORA
-        month_mapping = {
-            "ENERO": 1,
-            "FEBRERO": 2,
-            "MARZO": 3,
-            "ABRIL": 4,
-            "MAYO": 5,
-            "JUNIO": 6,
-            "JULIO": 7,
-            "AGOSTO": 8,
-            "SEPTIEMBRE": 9,
-            "OCTUBRE": 10,
-            "NOVIEMBRE": 11,
-            "DICIEMBRE": 12,
-        }
+# BÚSQUEDA GLOBAL
 
-        year = data_filter.pop("year", None)
-        month = data_filter.pop("months", None)
 
-        if year and month:
-            year = int(year)
-            month = month_mapping.get(month.upper())
-            start_date = datetime(year, month, 1)
-            if month == 12:
-                end_date = datetime(year + 1, 1, 1)
-            else:
-                end_date = datetime(year, month + 1, 1)
-            data_filter["created__range"] = (start_date, end_date)
+class GlobalSearchView(LoginRequiredMixin, View):
+    """Typeahead de la barra superior sobre ``rrgg.models.SearchEntry``."""
 
-        # COUNT COTIZACIONES
+    min_length = 2
+    per_kind = 5
+    labels = {
+        "natural_person": "Personas naturales",
+        "legal_person": "Personas jurídicas",
+        "vehicle": "Vehículos",
+        "quotation": "Cotizaciones",
+        "issuance": "Pólizas",
+    }
 
-        histogram_total_quotations = (
-            rrgg.models.QuotationInsuranceVehiclePremium.objects.filter(
-                **data_filter
-            )
-            .annotate(
-                year=ExtractYear("created"),
-                month=ExtractMonth("created"),
-            )
-            .values(
-                "year",
-                "month",
-                "insurance_vehicle_ratio__insurance_vehicle__name",
-            )
-            .annotate(total=Count("id"))
-            .order_by(
-                "insurance_vehicle_ratio__insurance_vehicle__name",
-                "year",
-                "month",
-            )
+    def get_url(self, entry):
+        registrar_id = self.kwargs["registrar_id"]
+        issuance_list = urls.reverse(
+            "rrggweb:issuance:insurance:vehicle:list",
+            kwargs={"registrar_id": registrar_id},
         )
-
-        context["histogram_total_quotations_series"] = [
-            item["total"] for item in histogram_total_quotations
-        ]
-
-        context["histogram_total_quotations_labels"] = [
-            item["insurance_vehicle_ratio__insurance_vehicle__name"]
-            for item in histogram_total_quotations
-        ]
-
-        # COUNT EMISIONES
-        histogram_total_issuances = (
-            rrgg.models.IssuanceInsuranceVehicle.objects.filter(**data_filter)
-            .annotate(
-                year=ExtractYear("created"),
-                month=ExtractMonth("created"),
-            )
-            .values(
-                "year",
-                "month",
-                "quotation_vehicle_premiums__insurance_vehicle_ratio__insurance_vehicle__name",  # noqa: E501
-            )
-            .annotate(total=Count("id") * 2)
-            .order_by(
-                "quotation_vehicle_premiums__insurance_vehicle_ratio__insurance_vehicle__name",  # noqa: E501
-                "year",
-                "month",
+        if entry.kind in ("natural_person", "legal_person"):
+            if entry.link_id:
+                return urls.reverse(
+                    "rrggweb:customer_membership:detail",
+                    kwargs={"registrar_id": registrar_id, "pk": entry.link_id},
+                )
+            # propietario que no es cliente: sus pólizas por documento
+            return f"{issuance_list}?{urlencode({'q': entry.subtitle})}"
+        if entry.kind == "vehicle":
+            return f"{issuance_list}?{urlencode({'q': entry.title})}"
+        if entry.kind == "quotation":
+            return urls.reverse(
+                "rrggweb:quotation:insurance:vehicle:detail",
+                kwargs={
+                    "registrar_id": registrar_id,
+                    "quotation_id": entry.object_id,
+                },
             )
+        return urls.reverse(
+            "rrggweb:issuance:insurance:vehicle:detail",
+            kwargs={
+                "registrar_id": registrar_id,
+                "issuance_id": entry.object_id,
+            },
         )
 
-        context["histogram_total_issuances_series"] = [
-            int(item["total"]) for item in histogram_total_issuances
-        ]
-
-        context["histogram_total_issuances_labels"] = [
-            item[
-                "quotation_vehicle_premiums__insurance_vehicle_ratio__insurance_vehicle__name"  # noqa: E501
-            ]
-            for item in histogram_total_issuances
-        ]
-
-        return context
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get("q", "").strip()
+        groups = []
+        if len(query) >= self.min_length:
+            for kind, entries in global_search.search(query, self.per_kind):
+                groups.append(
+                    {
+                        "kind": kind,
+                        "label": self.labels[kind],
+                        "results": [
+                            {
+                                "title": entry.title,
+                                "subtitle": entry.subtitle,
+                                "url": self.get_url(entry),
+                            }
+                            for entry in entries
+                        ],
+                    }
+                )
+        return JsonResponse({"query": query, "groups": groups})
 
 
 # ------------------------------
@@ -1592,9 +1576,16 @@ class QIVDeletePremiumView(DeletePremiumSupportView):
 
 
 class QIVReportXlsxView(View):
+    template_path = QUOTATION_REPORT_TEMPLATE
+    columns = QUOTATION_REPORT_COLUMNS
+
     def get(self, request, *args, **kwargs):
         quotation = shortcuts.get_object_or_404(
-            rrgg.models.QuotationInsuranceVehicle,
+            rrgg.models.QuotationInsuranceVehicle.objects.select_related(
+                "vehicle__use_type",
+                "customer__natural_person",
+                "customer__legal_person",
+            ),
             id=kwargs["quotation_id"],
         )
         workbook = self.create_workbook(quotation)
@@ -1609,9 +1600,7 @@ class QIVReportXlsxView(View):
         return response
 
     def create_workbook(self, quotation):
-        from openpyxl import load_workbook
-
-        wb = load_workbook(filename="rrggweb/resources/report_quotations.xlsx")
+        wb = load_template(self.template_path)
         ws = wb.active
         ws["C11"] = quotation.insured_amount
         ws["I6"] = quotation.created.strftime("%d/%m/%Y")
@@ -1622,34 +1611,16 @@ class QIVReportXlsxView(View):
         ws["C10"] = vehicle.use_type.name
         ws["C6"] = str(quotation.customer)
 
-        for premium in quotation.premiums.all():
-            ratio = premium.insurance_vehicle_ratio
-            insurance_vehicle = ratio.insurance_vehicle
-            if premium.amount > 0 and insurance_vehicle.id == 1:
-                ws["E13"] = premium.amount
-                ws["E14"] = ws["E13"].value * ratio.emission_right
-                ws["E15"] = (ws["E13"].value + ws["E14"].value) * ratio.tax
-                ws["E16"] = ws["E13"].value + ws["E14"].value + ws["E15"].value
-            if premium.amount > 0 and insurance_vehicle.id == 2:
-                ws["G13"] = premium.amount
-                ws["G14"] = ws["G13"].value * ratio.emission_right
-                ws["G15"] = (ws["G13"].value + ws["G14"].value) * ratio.tax
-                ws["G16"] = ws["G13"].value + ws["G14"].value + ws["G15"].value
-            if premium.amount > 0 and insurance_vehicle.id == 3:
-                ws["I13"] = premium.amount
-                ws["I14"] = ws["I13"].value * ratio.emission_right
-                ws["I15"] = (ws["I13"].value + ws["I14"].value) * ratio.tax
-                ws["I16"] = ws["I13"].value + ws["I14"].value + ws["I15"].value
-            if premium.amount > 0 and insurance_vehicle.id == 4:
-                ws["K13"] = premium.amount
-                ws["K14"] = ws["K13"].value * ratio.emission_right
-                ws["K15"] = (ws["K13"].value + ws["K14"].value) * ratio.tax
-                ws["K16"] = ws["K13"].value + ws["K14"].value + ws["K15"].value
-            if premium.amount > 0 and insurance_vehicle.id == 5:
-                ws["M13"] = premium.amount
-                ws["M14"] = ws["M13"].value * ratio.emission_right
-                ws["M15"] = (ws["M13"].value + ws["M14"].value) * ratio.tax
-                ws["M16"] = ws["M13"].value + ws["M14"].value + ws["M15"].value
+        for quote in pricing.quote_all(quotation):
+            column = self.columns.get(quote.insurance_vehicle.id)
+            if column is None or quote.premium is None:
+                continue
+            if quote.premium.amount <= 0:
+                continue
+            ws[f"{column}13"] = quote.premium.amount
+            ws[f"{column}14"] = quote.figures["emission_right"]
+            ws[f"{column}15"] = quote.figures["tax"]
+            ws[f"{column}16"] = quote.figures["total"]
 
         return wb
 
@@ -1661,12 +1632,22 @@ class QIVReportPdfView(View):
 
         templatename = "rrggweb/quotation/insurance/vehicle/report.html"
         quotation = shortcuts.get_object_or_404(
-            rrgg.models.QuotationInsuranceVehicle,
+            rrgg.models.QuotationInsuranceVehicle.objects.select_related(
+                "currency",
+                "vehicle__use_type",
+                "customer__natural_person",
+                "customer__legal_person",
+            ),
             id=kwargs["quotation_id"],
         )
-        premiums = quotation.premiums.all().order_by(
-            "insurance_vehicle_ratio__insurance_vehicle__id"
-        )
+        premiums = []
+        for quote in sorted(
+            pricing.quote_all(quotation),
+            key=lambda quote: quote.insurance_vehicle.id,
+        ):
+            if quote.premium is not None:
+                quote.premium.figures = quote.figures
+                premiums.append(quote.premium)
         my_range = range(1, 6)
 
         html_string = render_to_string(
@@ -2466,11 +2447,24 @@ class QIVPremiumsFormView(LoginRequiredMixin, FormView):
         kwargs["queryset"] = rrgg.models.InsuranceVehicle.objects.none()
         return kwargs
 
+    @cached_property
+    def quotation(self):
+        return shortcuts.get_object_or_404(
+            rrgg.models.QuotationInsuranceVehicle,
+            id=self.kwargs["quotation_id"],
+        )
+
+    @cached_property
+    def ratios(self):
+        # un ratio vigente por aseguradora, en el orden de la tabla
+        return pricing.current_ratios()
+
     def get_form(self):
+        ratios = self.ratios
         form_class = modelformset_factory(
             rrgg.models.QuotationInsuranceVehiclePremium,
             form=forms.QuotationInsuranceVehiclePremiumForm,
-            extra=rrgg.models.InsuranceVehicle.objects.count(),
+            extra=len(ratios),
             fields=[
                 "insurance_vehicle_ratio",
                 "quotation_insurance_vehicle",
@@ -2479,24 +2473,16 @@ class QIVPremiumsFormView(LoginRequiredMixin, FormView):
             ],
         )
         formset = super().get_form(form_class)
-        # Mantener el orden: Ver ABC123
-        insurance_vehicles = rrgg.models.InsuranceVehicle.objects.order_by(
-            "name"
-        )
-        for form, insurance_vehicle in zip(formset, insurance_vehicles):
+        quotation = self.quotation
+        for form, ratio in zip(formset, ratios):
             insurance_vehicle_ratio = form.fields["insurance_vehicle_ratio"]
             quotation_insurance_vehicle = form.fields[
                 "quotation_insurance_vehicle"
             ]
-            insurance_vehicle_ratio.initial = insurance_vehicle.last_ratio
-            quotation_insurance_vehicle.initial = shortcuts.get_object_or_404(
-                rrgg.models.QuotationInsuranceVehicle,
-                id=self.kwargs["quotation_id"],
-            )
-            form.tax_percentage = insurance_vehicle_ratio.initial.tax
-            form.emission_right_percentage = (
-                insurance_vehicle_ratio.initial.emission_right
-            )
+            insurance_vehicle_ratio.initial = ratio
+            quotation_insurance_vehicle.initial = quotation
+            form.tax_percentage = ratio.tax
+            form.emission_right_percentage = ratio.emission_right
             insurance_vehicle_ratio.widget = forms.forms.HiddenInput()
             quotation_insurance_vehicle.widget = forms.forms.HiddenInput()
 
@@ -2515,10 +2501,7 @@ class QIVPremiumsFormView(LoginRequiredMixin, FormView):
         context = super().get_context_data(**kwargs)
         context["title"] = "COTIZACIÓN VEHICULAR"
         context["subtitle"] = "Registrar primas de aseguradoras"
-        context["quotation"] = shortcuts.get_object_or_404(
-            rrgg.models.QuotationInsuranceVehicle,
-            id=self.kwargs["quotation_id"],
-        )
+        context["quotation"] = self.quotation
         context["insurances"] = rrgg.models.InsuranceVehicle.objects.all()
         context["seller"] = context["quotation"].consultant_seller
         context["customer"] = context["quotation"].customer
@@ -2531,15 +2514,7 @@ class QIVPremiumsFormView(LoginRequiredMixin, FormView):
                 "quotation_id": self.kwargs["quotation_id"],
             },
         )
-        # Mantener el orden: Ver ABC123
-        insurance_vehicles = rrgg.models.InsuranceVehicle.objects.order_by(
-            "name"
-        )
-        last_ratios = (
-            insurance_vehicle.last_ratio
-            for insurance_vehicle in insurance_vehicles
-        )
-        context["last_ratio_forms"] = zip(last_ratios, context["form"])
+        context["last_ratio_forms"] = zip(self.ratios, context["form"])
 
         return context
 
@@ -2577,6 +2552,10 @@ class IIVListView(IssuanceListSupportView):
             kwargs={"registrar_id": self.kwargs["registrar_id"]},
         )
         context["type"] = "initial"
+        context["export_url"] = urls.reverse(
+            "rrggweb:issuance:insurance:vehicle:export",
+            kwargs={"registrar_id": self.kwargs["registrar_id"]},
+        )
         # total_issuances = (
         #     rrgg.models.IssuanceInsuranceVehicle.objects.all().count()
         # )
@@ -2584,6 +2563,64 @@ class IIVListView(IssuanceListSupportView):
         return context
 
 
+class IIVExportView(SpreadsheetExportMixin, IssuanceListSupportView):
+    """Descarga el listado de emisiones, con la búsqueda aplicada."""
+
+    filename = "emisiones_vehiculares"
+    sheet_title = "Emisiones"
+    # columna -> campo o anotación de la consulta
+    columns = [
+        ("Contratante", "customer_name"),
+        ("Nº de póliza", "policy"),
+        ("Documento de cobranza", "collection_document"),
+        ("Vehículo", "plate"),
+        ("Aseguradora", "insurer_name"),
+        ("Asesor", "seller_name"),
+        ("Tipo", "issuance_type__name"),
+        ("Estado", "status__name"),
+        ("Fecha de emisión", "issuance_date"),
+        ("Inicio de vigencia", "initial_validity"),
+        ("Fin de vigencia", "final_validity"),
+        ("Moneda", "currency_name"),
+        ("Suma asegurada", "computed_insured_amount"),
+        ("Prima neta", "computed_net_premium"),
+        ("Derecho de emisión", "computed_emission_right"),
+        ("Prima comercial", "computed_commercial_premium"),
+        ("IGV", "computed_tax"),
+        ("Prima total", "computed_total_premium"),
+        ("Comisión neta", "computed_net_commission"),
+        ("Comisión del asesor", "computed_seller_commission"),
+        ("Comisión KCS", "computed_kcs_commission"),
+    ]
+
+    def get_header(self):
+        return [title for title, _field in self.columns]
+
+    def get_rows(self):
+        currency = rrgg.models.QuotationInsuranceVehiclePremium.objects.filter(
+            issuances=OuterRef("pk")
+        ).order_by("id")
+        queryset = (
+            self.get_queryset()
+            .with_totals()
+            .annotate(
+                currency_name=Subquery(
+                    currency.values(
+                        "quotation_insurance_vehicle__currency__name"
+                    )[:1]
+                ),
+                seller_name=Concat(
+                    "consultant_seller__given_name",
+                    Value(" "),
+                    "consultant_seller__first_surname",
+                    output_field=CharField(),
+                ),
+            )
+            .values_list(*[field for _title, field in self.columns])
+        )
+        return queryset.iterator(chunk_size=self.chunk_size)
+
+
 class IIVUpdateIssuanceDetailView(UpdateIssuanceSupportView):
     def get_success_url(self):
         return urls.reverse(
@@ -2611,7 +2648,20 @@ class IIVDetailView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         context["title"] = "EMISIÓN VEHICULAR"
         context["subtitle"] = "Detalle de la emisión"
-        context["premiums"] = self.object.quotation_vehicle_premiums.all()
+        quotation = "quotation_insurance_vehicle__"
+        premiums = list(
+            self.object.quotation_vehicle_premiums.select_related(
+                "insurance_vehicle_ratio__insurance_vehicle",
+                f"{quotation}currency",
+                f"{quotation}risk",
+                f"{quotation}customer__natural_person__document_type",
+                f"{quotation}customer__legal_person__document_type",
+                f"{quotation}vehicle__use_type",
+                f"{quotation}vehicle__endorsement_bank",
+            ).order_by("id")
+        )
+        context["premiums"] = premiums
+        context["first_premium"] = premiums[0] if premiums else None
         context["seller"] = self.object.consultant_seller
         context["create_document"] = urls.reverse(
             "rrggweb:issuance:insurance:vehicle:create_document_ed",
@@ -6944,7 +6994,7 @@ class CollectionInsuranceVehicleCreateCollectionView(
 # CLIENT MAIN
 
 
-class CustomerMembershipListView(ListView):
+class CustomerMembershipListView(CursorPaginationMixin, ListView):
     template_name = "rrggweb/client/list.html"
     model = rrgg.models.CustomerMembership
     context_object_name = "memberships"
@@ -6952,24 +7002,35 @@ class CustomerMembershipListView(ListView):
     ordering = ["-id"]
 
     def get_queryset(self):
-        query = self.request.GET.get("q")
+        queryset = (
+            super()
+            .get_queryset()
+            .select_related(
+                "natural_person__document_type",
+                "legal_person__document_type",
+                "seller",
+            )
+        )
+        query = self.request.GET.get("q", "").strip()
         if query:
-            natural_persons = rrgg.models.NaturalPerson.objects.filter(
-                Q(given_name__icontains=query)
-                | Q(first_surname__icontains=query)
-                | Q(second_surname__icontains=query)
-                | Q(birthdate__icontains=query)
-                | Q(document_number__icontains=query)
-            ).distinct()
-            legal_persons = rrgg.models.LegalPerson.objects.filter(
-                Q(registered_name__icontains=query)
-                | Q(general_manager__icontains=query)
-                | Q(anniversary_date__icontains=query)
-                | Q(document_number__icontains=query)
-            ).distinct()
-            return list(natural_persons) + list(legal_persons)
-        else:
-            return super().get_queryset()
+            queryset = queryset.filter(id__in=self.search_ids(query))
+        return queryset
+
+    def search_ids(self, query):
+        # los nombres usan los índices trigram y el documento el índice de
+        # prefijo; el UNION se resuelve en la misma consulta del listado
+        natural = self.model.objects.filter(
+            Q(natural_person__given_name__icontains=query)
+            | Q(natural_person__first_surname__icontains=query)
+            | Q(natural_person__second_surname__icontains=query)
+            | Q(natural_person__document_number__istartswith=query)
+        )
+        legal = self.model.objects.filter(
+            Q(legal_person__registered_name__icontains=query)
+            | Q(legal_person__general_manager__icontains=query)
+            | Q(legal_person__document_number__istartswith=query)
+        )
+        return natural.values("id").union(legal.values("id"))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -6981,9 +7042,10 @@ class CustomerMembershipListView(ListView):
         )
         context["search_query"] = self.request.GET.get("q", "")
         context["num_results"] = len(context["memberships"])
-        context["num_registers"] = self.model.objects.count()
+        context["num_registers"] = approximate_count(self.model.objects.all())
         if self.request.GET.get("page"):
-            context["page_number"] = int(self.request.GET.get("page"))
+            # número de página o cursor, se devuelve tal cual al listado
+            context["page_number"] = self.request.GET.get("page")
         return context
 
 
@@ -7266,21 +7328,149 @@ class CMCreateLegalPersonView(CreateLegalPersonSupportView):
         return context
 
 
-class HistoricalDataListView(ListView):
-    model = rrgg.models.HistoricalData
+class HistoricalDataListView(TemplateView):
     template_name = "rrggweb/historical_data/list.html"
-    context_object_name = "data"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        years = rrgg.models.HistoricalData.objects.values_list(
-            "year", flat=True
-        ).distinct()
+        years = (
+            rrgg.models.HistoricalRecord.objects.values_list("year", flat=True)
+            .distinct()
+            .order_by("year")
+        )
         context["years"] = years
         context["search_query"] = self.request.GET.get("q", "")
         return context
 
 
+class HistoricalDataTableView(LoginRequiredMixin, View):
+    """Listado histórico con el protocolo server-side de DataTables."""
+
+    # columna de la tabla -> campo para ordenar
+    columns = [
+        ("customer", "customer"),
+        ("document_number", "document_number"),
+        ("policy", "policy"),
+        ("consultant", "consultant"),
+        ("total_premium", "record__total_premium"),
+        ("risk", "risk"),
+        ("months", "record__month"),
+        ("year", "record__year"),
+        ("observations", "observations"),
+    ]
+    search_fields = [
+        "customer",
+        "document_number",
+        "policy",
+        "consultant",
+    ]
+    max_length = 100
+
+    @staticmethod
+    def _int(value, default):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    def get_queryset(self):
+        queryset = rrgg.models.HistoricalData.objects.all()
+        year = self.request.GET.get("year", "")
+        if year.isdigit():
+            queryset = queryset.filter(record__year=int(year))
+        search = self.get_search()
+        if search:
+            condition = Q()
+            for field in self.search_fields:
+                condition |= Q(**{f"{field}__icontains": search})
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def get_search(self):
+        return self.request.GET.get("search[value]", "").strip()
+
+    def get_ordering(self):
+        ordering = []
+        index = 0
+        while f"order[{index}][column]" in self.request.GET:
+            column = self._int(
+                self.request.GET.get(f"order[{index}][column]"), -1
+            )
+            if 0 <= column < len(self.columns):
+                field = self.columns[column][1]
+                if self.request.GET.get(f"order[{index}][dir]") == "desc":
+                    field = f"-{field}"
+                ordering.append(field)
+            index += 1
+        return [*ordering, "id"]
+
+    def get(self, request, *args, **kwargs):
+        start = max(self._int(request.GET.get("start"), 0), 0)
+        length = self._int(request.GET.get("length"), 10)
+        if not 0 < length <= self.max_length:
+            length = self.max_length
+        end = start + length
+        queryset = self.get_queryset()
+        rows = queryset.order_by(*self.get_ordering()).values(
+            "id", *(column for column, _field in self.columns)
+        )[start:end]
+
+        registrar_id = self.kwargs["registrar_id"]
+        data = []
+        for row in rows:
+            row["detail_url"] = urls.reverse(
+                "rrggweb:historical_data:detail",
+                kwargs={"registrar_id": registrar_id, "pk": row["id"]},
+            )
+            row["update_url"] = urls.reverse(
+                "rrggweb:historical_data:update",
+                kwargs={
+                    "registrar_id": registrar_id,
+                    "historical_data_id": row["id"],
+                },
+            )
+            data.append(row)
+
+        total = approximate_count(rrgg.models.HistoricalData.objects.all())
+        filtered = approximate_count(queryset)
+        return JsonResponse(
+            {
+                "draw": self._int(request.GET.get("draw"), 0),
+                "recordsTotal": total,
+                "recordsFiltered": filtered,
+                "estimated": total.estimated or filtered.estimated,
+                "data": data,
+            }
+        )
+
+
+class HistoricalDataExportView(
+    SpreadsheetExportMixin, HistoricalDataTableView
+):
+    """Exporta el listado histórico filtrado sin cargarlo en memoria."""
+
+    filename = "data_historica"
+    sheet_title = "Data histórica"
+
+    def get_search(self):
+        return self.request.GET.get("q", "").strip()
+
+    def get_header(self):
+        return [
+            field.name
+            for field in rrgg.models.HistoricalData._meta.concrete_fields
+            if not field.primary_key
+        ]
+
+    def get_rows(self):
+        return (
+            self.get_queryset()
+            .order_by("id")
+            .values_list(*self.get_header())
+            .iterator(chunk_size=self.chunk_size)
+        )
+
+
 class HistoricalDataDetailView(DetailView):
     model = rrgg.models.HistoricalData
     template_name = "rrggweb/historical_data/detail.html"
@@ -7314,3 +7504,112 @@ class HistoricalDataUpdateView(UpdateView):
             "rrggweb:historical_data:detail",
             kwargs={"pk": self.object.id},
         )
+
+
+# LIQUIDACIÓN DE COMISIONES
+
+
+class CommissionPeriodMixin:
+    """Lee el periodo (``year``, ``month``) y el asesor de la consulta."""
+
+    def get_period(self):
+        today = timezone.localdate()
+        year = self.request.GET.get("year", "")
+        month = self.request.GET.get("month", "")
+        year = int(year) if year.isdigit() else today.year
+        month = int(month) if month.isdigit() else today.month
+        if not datetime.MINYEAR <= year <= datetime.MAXYEAR:
+            year = today.year
+        if not 1 <= month <= 12:
+            month = today.month
+        return year, month
+
+    def get_consultant_id(self):
+        consultant = self.request.GET.get("consultant", "")
+        return int(consultant) if consultant.isdigit() else None
+
+    def get_statement(self):
+        return commissions.statement(
+            *self.get_period(), consultant_id=self.get_consultant_id()
+        )
+
+
+class CommissionStatementView(
+    LoginRequiredMixin, CommissionPeriodMixin, TemplateView
+):
+    template_name = "rrggweb/commission/statement.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        year, month = self.get_period()
+        statement = self.get_statement()
+        totals = {}
+        for row in statement:
+            total = totals.setdefault(
+                row.currency,
+                dict.fromkeys(commissions.FIELDS, Decimal(0)),
+            )
+            for field in commissions.FIELDS:
+                total[field] += getattr(row, field)
+        context["statement"] = statement
+        context["totals"] = totals
+        context["closed"] = commissions.is_closed(year, month)
+        context["unassigned_endorsements"] = (
+            commissions.unassigned_endorsements(year, month)
+        )
+        context["selected_year"] = year
+        context["selected_month"] = month
+        context["selected_consultant"] = self.get_consultant_id()
+        context["years"] = sorted(
+            {year, timezone.localdate().year}
+            | {
+                issuance_year.year
+                for issuance_year in (
+                    rrgg.models.IssuanceInsuranceVehicle.objects.dates(
+                        "issuance_date", "year"
+                    )
+                )
+            },
+            reverse=True,
+        )
+        context["months"] = list(enumerate(MONTHS, start=1))
+        context["consultants"] = rrgg.models.Consultant.objects.order_by(
+            "given_name", "first_surname"
+        )
+        context["export_url"] = urls.reverse(
+            "rrggweb:commission:export",
+            kwargs={"registrar_id": self.kwargs["registrar_id"]},
+        )
+        return context
+
+
+class CommissionStatementExportView(
+    LoginRequiredMixin, SpreadsheetExportMixin, CommissionPeriodMixin, View
+):
+    """Descarga la liquidación del periodo en CSV o XLSX."""
+
+    sheet_title = "Comisiones"
+    columns = [
+        ("Asesor", "consultant"),
+        ("Tipo", "kind"),
+        ("Moneda", "currency"),
+        ("Cantidad", "count"),
+        ("Prima neta", "net_premium"),
+        ("Comisión neta", "net_commission"),
+        ("Comisión del asesor", "seller_commission"),
+        ("Comisión KCS", "kcs_commission"),
+    ]
+
+    @property
+    def filename(self):
+        year, month = self.get_period()
+        return f"comisiones_{year}_{month:02d}"
+
+    def get_header(self):
+        return [title for title, _field in self.columns]
+
+    def get_rows(self):
+        return [
+            [getattr(row, field) for _title, field in self.columns]
+            for row in self.get_statement()
+        ]